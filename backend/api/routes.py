@@ -1,70 +1,458 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Dict, Any
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, Dict, Any, List, Literal, Optional, Tuple
+import asyncio
+import hmac
 import json
+import math
+import os
 
 # Import based on deployment environment
 try:
-    from backend.models.titanic_agent import create_titanic_agent
+    from backend.utils.executor import query_executor
+    from backend.utils.http_cache import cache_control, etag_matches, make_etag
+    from backend.utils.metrics import stage_timer
+    from backend.models.router import normalize_query
 except ImportError:
     # Fallback for local development
-    from ..models.titanic_agent import create_titanic_agent
+    from ..utils.executor import query_executor
+    from ..utils.http_cache import cache_control, etag_matches, make_etag
+    from ..utils.metrics import stage_timer
+    from ..models.router import normalize_query
+
+# The agent module pulls in pandas, plotly and langchain, so it is only
+# imported when the registry is first needed
+if TYPE_CHECKING:
+    from backend.models.titanic_agent import ToolResult
 
 router = APIRouter()
 
+# Largest number of queries accepted by /ask/batch
+MAX_BATCH_QUERIES = 50
+
+# Token required in the X-Admin-Token header by the /admin endpoints; they
+# are disabled when it is not set
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Seconds clients may reuse the /info response without revalidating it; 0
+# makes them revalidate every time, which costs a 304 when nothing changed
+INFO_MAX_AGE = int(os.environ.get("INFO_MAX_AGE", 0))
+
+# Seconds clients may reuse a successful answer without revalidating it
+ANSWER_MAX_AGE = int(os.environ.get("ANSWER_MAX_AGE", 0))
+
+SAMPLE_QUESTIONS = [
+    "What percentage of passengers were male on the Titanic?",
+    "Show me a histogram of passenger ages",
+    "What was the average ticket fare?",
+    "How many passengers embarked from each port?"
+]
+
+# "html" returns a self-contained HTML page per chart, "json" a compact
+# plotly figure spec for clients that render charts themselves
+VisualizationFormat = Literal["html", "json"]
+
 class QueryRequest(BaseModel):
     query: str
+    visualization_format: VisualizationFormat = "html"
 
-@router.post("/ask")
-async def ask_titanic_question(request: QueryRequest) -> Dict[str, Any]:
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    visualization_format: VisualizationFormat = "html"
+
+def get_registry(request: Request):
     """
-    Process a natural language query about the Titanic dataset.
+    Dependency returning the shared agent registry.
+
+    The registry is normally attached to the app during startup; fall back
+    to the process-wide one if the lifespan hook did not run.
+    """
+    registry = getattr(request.app.state, "agent_registry", None)
+    if registry is None:
+        try:
+            from backend.models.titanic_agent import get_agent_registry
+        except ImportError:
+            # Fallback for local development
+            from ..models.titanic_agent import get_agent_registry
+        registry = get_agent_registry()
+    return registry
+
+def get_titanic_agent(registry=Depends(get_registry)):
+    """
+    Dependency returning the shared query handler.
+    """
+    return registry.handler
+
+def get_query_executor(request: Request):
+    """
+    Dependency returning the executor that runs query handlers.
+    """
+    return getattr(request.app.state, "query_executor", query_executor)
+
+def get_answer_cache(request: Request):
+    """
+    Dependency returning the answer cache, or None if caching is off.
+    """
+    return getattr(request.app.state, "answer_cache", None)
+
+def get_data_loader():
+    """
+    Dependency returning the shared dataset loader.
+    """
+    # Import based on deployment environment
+    try:
+        from backend.utils.data_loader import titanic_data
+    except ImportError:
+        # Fallback for local development
+        from ..utils.data_loader import titanic_data
+    return titanic_data
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convert numpy scalars (including dict keys) to plain Python values and
+    NaN to None so tool data can be encoded as strict JSON.
+    """
+    if isinstance(value, dict):
+        return {to_jsonable(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if type(value).__module__ == "numpy":
+        # numpy scalar
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def build_answer(query: str, result: 'ToolResult', visualization_format: str = "html") -> Dict[str, Any]:
+    """
+    Serialize a tool result into the /ask response format.
     
     Args:
-        request: QueryRequest containing the user's question
+        query: The user's question
+        result: Structured result from the query handler
+        visualization_format: "html" or "json"
         
     Returns:
         Dictionary containing the response and any visualizations
     """
+    visualization = result.figure.render(visualization_format) if result.figure is not None else ""
+    with stage_timer("response"):
+        return {
+            "query": query,
+            "text_response": result.text,
+            "visualization": visualization,
+            "visualization_format": visualization_format,
+            "data": to_jsonable(result.data),
+            "success": result.success
+        }
+
+def build_error(query: str, error: Exception) -> Dict[str, Any]:
+    """
+    Build the unsuccessful answer for a query that failed.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        text_response = "Your query took too long to process. Please try again."
+    else:
+        text_response = f"Error processing your query: {str(error)}"
+    return {
+        "query": query,
+        "text_response": text_response,
+        "visualization": "",
+        "data": None,
+        "success": False
+    }
+
+def build_answers(queries: List[str], responses: List[Any], visualization_format: str = "html") -> List[tuple]:
+    """
+    Serialize handler responses, pairing each with its query. A response
+    that is an exception becomes an unsuccessful answer.
+    """
+    answers = []
+    for query, response in zip(queries, responses):
+        if isinstance(response, Exception):
+            answers.append((query, build_error(query, response)))
+        else:
+            answers.append((query, build_answer(query, response, visualization_format)))
+    return answers
+
+def is_cacheable(response: Any) -> bool:
+    """
+    Whether the answer to a handler response may be cached: it must have
+    succeeded, and the tools must have understood the question. Answers to
+    questions they didn't understand are retried, since the LLM fallback
+    may answer them once it is reachable again.
+    """
+    return not isinstance(response, Exception) and response.success and response.understood
+
+def answer_cache_key(cache, query: str, visualization_format: str, data_loader) -> str:
+    """
+    Cache key for a query: its normalized form, the visualization format
+    and the fingerprint of the dataset currently served.
+    """
+    return cache.key(normalize_query(query), visualization_format, data_loader.snapshot.fingerprint)
+
+def encode_answer(answer: Dict[str, Any]) -> Tuple[bytes, Optional[str]]:
+    """
+    Serialize an answer to JSON bytes. Successful answers are deterministic
+    for a given question, format and dataset, so they get a content-hash
+    ETag; failed ones get none.
+    """
+    body = json.dumps(answer, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    return body, make_etag(body) if answer["success"] else None
+
+def answer_response(body: bytes, etag: Optional[str], if_none_match: Optional[str] = None) -> Response:
+    """
+    Build the HTTP response for an encoded answer, or a 304 if the client's
+    If-None-Match already names it.
+    """
+    if etag is None:
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+    headers = {"ETag": etag, "Cache-Control": cache_control(ANSWER_MAX_AGE)}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def answer_question(query: str, visualization_format: str, agent, executor, cache,
+                          data_loader) -> Tuple[bytes, Optional[str]]:
+    """
+    Answer a question and encode the answer, from the answer cache when
+    possible, caching successful answers to questions the tools understood.
+    
+    Every step shares the executor's timeout as one deadline; if it passes,
+    or any step fails, the encoded error answer is returned instead.
+    
+    Returns:
+        The encoded answer and its ETag, see encode_answer
+    """
+    deadline = executor.deadline()
     try:
-        # Create the agent
-        agent = create_titanic_agent()
-        
-        # Process the query
-        response = agent(request.query)
+        key = None
+        if cache is not None:
+            key = answer_cache_key(cache, query, visualization_format, data_loader)
+            cached = await executor.run(cache.get, key, timeout=executor.remaining(deadline))
+            if cached is not None:
+                return await executor.run(encode_answer, dict(cached, query=query),
+                                          timeout=executor.remaining(deadline))
+        # Process the query off the event loop
+        response = await executor.run_query(agent, query, timeout=executor.remaining(deadline))
+        # Chart serialization is CPU-bound too
+        answer = await executor.run(build_answer, query, response, visualization_format,
+                                    timeout=executor.remaining(deadline))
+        encoded = await executor.run(encode_answer, answer, timeout=executor.remaining(deadline))
+    except Exception as e:
+        # Encoded here, as the pool may still be busy with a timed-out query
+        return encode_answer(build_error(query, e))
+    if key is not None and is_cacheable(response):
+        try:
+            await executor.run(cache.put, key, answer, timeout=executor.remaining(deadline))
+        except asyncio.TimeoutError:
+            pass
+    return encoded
+
+@router.post("/ask")
+async def ask_titanic_question(request: QueryRequest, agent=Depends(get_titanic_agent),
+                               executor=Depends(get_query_executor), cache=Depends(get_answer_cache),
+                               data_loader=Depends(get_data_loader)) -> Response:
+    """
+    Process a natural language query about the Titanic dataset.
+    
+    Successful answers are cached, so repeated questions skip the handler,
+    and carry an ETag of their content.
+    
+    Args:
+        request: QueryRequest containing the user's question
+        agent: Shared query handler from the agent registry
+        executor: Executor that runs the handler off the event loop
+        cache: Answer cache, or None if caching is off
+        data_loader: Shared dataset loader
         
-        # Check if the response contains HTML for visualization
-        has_visualization = "<div" in response and "plotly" in response
-        visualization_html = ""
+    Returns:
+        JSON response containing the answer and any visualizations
+    """
+    body, etag = await answer_question(request.query, request.visualization_format, agent, executor,
+                                       cache, data_loader)
+    return answer_response(body, etag)
+
+@router.get("/ask")
+async def get_titanic_answer(query: str, visualization_format: VisualizationFormat = "html",
+                             if_none_match: Optional[str] = Header(None),
+                             agent=Depends(get_titanic_agent), executor=Depends(get_query_executor),
+                             cache=Depends(get_answer_cache),
+                             data_loader=Depends(get_data_loader)) -> Response:
+    """
+    Same as POST /ask with the question in the query string, so that
+    clients and proxies can cache answers and revalidate them with
+    If-None-Match, getting a 304 while the answer is unchanged.
+    """
+    body, etag = await answer_question(query, visualization_format, agent, executor, cache, data_loader)
+    return answer_response(body, etag, if_none_match)
+
+@router.post("/ask/stream")
+async def stream_titanic_answer(request: QueryRequest, registry=Depends(get_registry),
+                                executor=Depends(get_query_executor), cache=Depends(get_answer_cache),
+                                data_loader=Depends(get_data_loader)) -> StreamingResponse:
+    """
+    Process a query and stream the answer as newline-delimited JSON.
+    
+    The text answer is sent as soon as it is ready, followed by the
+    visualization (if any) and a final "done" event with the success flag.
+    Answers share the answer cache with /ask: a cached answer is replayed
+    as the same events, and a streamed answer is cached once complete.
+    
+    Args:
+        request: QueryRequest containing the user's question
+        registry: Shared agent registry
+        executor: Executor that runs each step off the event loop
+        cache: Answer cache, or None if caching is off
+        data_loader: Shared dataset loader
         
-        if has_visualization:
-            # Extract the visualization HTML
-            start_idx = response.find('<div')
-            end_idx = response.rfind('</div>') + 6
-            visualization_html = response[start_idx:end_idx]
+    Returns:
+        Streaming response of JSON events, one per line
+    """
+    query, visualization_format = request.query, request.visualization_format
+    
+    async def events():
+        deadline = executor.deadline()
+        success = True
+        key = None
+        understood = False
+        try:
+            if cache is not None:
+                key = answer_cache_key(cache, query, visualization_format, data_loader)
+                cached = await executor.run(cache.get, key, timeout=executor.remaining(deadline))
+                if cached is not None:
+                    yield json.dumps({"type": "text", "text_response": cached["text_response"],
+                                      "data": cached["data"]}) + "\n"
+                    if cached["visualization"]:
+                        yield json.dumps({"type": "visualization", "visualization": cached["visualization"],
+                                          "visualization_format": visualization_format}) + "\n"
+                    yield json.dumps({"type": "done", "query": query, "success": True}) + "\n"
+                    return
             
-            # Get the text part (before or after HTML)
-            text_response = response.replace(visualization_html, "").strip()
-            if text_response.endswith("Here it is:") or "I've created" in text_response:
-                text_response = text_response.split("Here it is:")[0].split("I've created")[0].strip()
-        else:
-            text_response = response
-            visualization_html = ""
-        
-        return {
-            "query": request.query,
-            "text_response": text_response,
-            "visualization": visualization_html,
-            "success": True
-        }
+            stream = registry.stream(query, visualization_format)
+            text_response, visualization, data = None, "", None
+            while True:
+                event = await executor.run(next, stream, None, timeout=executor.remaining(deadline))
+                if event is None:
+                    break
+                event = to_jsonable(event)
+                if event["type"] == "error":
+                    success = False
+                elif event["type"] == "text":
+                    understood = event.pop("understood")
+                    text_response, data = event["text_response"], event["data"]
+                elif event["type"] == "visualization":
+                    visualization = event["visualization"]
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            success = False
+            error = build_error(query, e)
+            yield json.dumps({"type": "error", "text_response": error["text_response"]}) + "\n"
+        yield json.dumps({"type": "done", "query": query, "success": success}) + "\n"
+        if key is not None and success and understood:
+            # The answer /ask would have built
+            answer = {
+                "query": query,
+                "text_response": text_response,
+                "visualization": visualization,
+                "visualization_format": visualization_format,
+                "data": data,
+                "success": True
+            }
+            try:
+                await executor.run(cache.put, key, answer, timeout=executor.remaining(deadline))
+            except asyncio.TimeoutError:
+                pass
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/ask/batch")
+async def ask_titanic_questions(request: BatchQueryRequest, agent=Depends(get_titanic_agent),
+                                executor=Depends(get_query_executor), cache=Depends(get_answer_cache),
+                                data_loader=Depends(get_data_loader)) -> Dict[str, Any]:
+    """
+    Process several natural language queries in one request.
+    
+    Identical queries are answered once, cached answers are reused, and
+    the remaining queries run as a single job on the executor. All steps
+    share one deadline; queries it cuts short get unsuccessful answers.
+    
+    Args:
+        request: BatchQueryRequest containing the user's questions
+        agent: Shared query handler from the agent registry
+        executor: Executor that runs the handler off the event loop
+        cache: Answer cache, or None if caching is off
+        data_loader: Shared dataset loader
         
-    except Exception as e:
-        return {
-            "query": request.query,
-            "text_response": f"Error processing your query: {str(e)}",
-            "visualization": "",
-            "success": False
+    Returns:
+        Dictionary with one result per query, in input order
+    """
+    deadline = executor.deadline()
+    unique_queries = list(dict.fromkeys(request.queries))
+    answers = {}
+    keys = {}
+    if cache is not None:
+        keys = {
+            query: answer_cache_key(cache, query, request.visualization_format, data_loader)
+            for query in unique_queries
         }
+        try:
+            cached = await executor.run(lambda: [cache.get(keys[query]) for query in unique_queries],
+                                        timeout=executor.remaining(deadline))
+        except Exception:
+            cached = [None] * len(unique_queries)
+        for query, answer in zip(unique_queries, cached):
+            if answer is not None:
+                answers[query] = dict(answer, query=query)
+    
+    pending = [query for query in unique_queries if query not in answers]
+    if pending:
+        try:
+            responses = await executor.run_queries(agent, pending, timeout=executor.remaining(deadline))
+        except Exception as e:
+            responses = [e] * len(pending)
+        try:
+            computed = await executor.run(build_answers, pending, responses, request.visualization_format,
+                                          timeout=executor.remaining(deadline))
+        except Exception as e:
+            # Built here, as the pool may still be busy with timed-out queries
+            responses = [e] * len(pending)
+            computed = build_answers(pending, responses)
+        answers.update(computed)
+        if cache is not None:
+            cacheable = {query for query, response in zip(pending, responses) if is_cacheable(response)}
+            try:
+                await executor.run(lambda: [
+                    cache.put(keys[query], answer) for query, answer in computed
+                    if query in cacheable and answer["success"]
+                ], timeout=executor.remaining(deadline))
+            except asyncio.TimeoutError:
+                pass
+    
+    results = [answers[query] for query in request.queries]
+    return {
+        "results": results,
+        "success": all(result["success"] for result in results)
+    }
+
+@router.get("/cache")
+async def get_cache_stats(cache=Depends(get_answer_cache)):
+    """
+    Report the answer cache's size and hit rate.
+    """
+    if cache is None:
+        return {"enabled": False}
+    return dict(cache.stats(), enabled=True)
+
+@router.get("/llm")
+async def get_llm_stats(registry=Depends(get_registry)):
+    """
+    Report the LLM fallback's outcomes, token usage and cache.
+    """
+    if registry.llm_fallback is None:
+        return {"enabled": False}
+    return dict(registry.llm_fallback.stats(), enabled=True)
 
 @router.get("/health")
 async def health_check():
@@ -73,31 +461,99 @@ async def health_check():
     """
     return {"status": "healthy", "service": "Titanic Chatbot API"}
 
-@router.get("/info")
-async def get_dataset_info():
+# (dataset version, serialized /info body, ETag) for the latest version served
+_info_cache = None
+
+def dataset_info(snapshot) -> Tuple[bytes, str]:
     """
-    Get basic information about the Titanic dataset.
+    Return the serialized /info body for a dataset snapshot and its ETag,
+    building them once per dataset version.
     """
-    # Import based on deployment environment
-    try:
-        from backend.utils.data_loader import titanic_data
-    except ImportError:
-        # Fallback for local development
-        from ..utils.data_loader import titanic_data
-    
-    df = titanic_data.get_dataframe()
-    
+    global _info_cache
+    cached = _info_cache
+    if cached is not None and cached[0] == snapshot.version:
+        return cached[1], cached[2]
+    profile = snapshot.profile
     info = {
-        "total_passengers": len(df),
-        "columns": list(df.columns),
-        "numeric_columns": df.select_dtypes(include=['number']).columns.tolist(),
-        "categorical_columns": df.select_dtypes(include=['object']).columns.tolist(),
-        "sample_questions": [
-            "What percentage of passengers were male on the Titanic?",
-            "Show me a histogram of passenger ages",
-            "What was the average ticket fare?",
-            "How many passengers embarked from each port?"
-        ]
+        "dataset_version": snapshot.version,
+        "fingerprint": snapshot.fingerprint,
+        "total_passengers": profile["rows"],
+        "columns": [column["name"] for column in profile["columns"]],
+        "numeric_columns": [column["name"] for column in profile["columns"] if column["kind"] == "numeric"],
+        "categorical_columns": [column["name"] for column in profile["columns"] if column["kind"] == "categorical"],
+        "profile": profile,
+        "memory": snapshot.memory_report,
+        "sample_questions": SAMPLE_QUESTIONS
+    }
+    body = json.dumps(info, separators=(",", ":")).encode()
+    # The version counter is per process, so worker processes serving the
+    # same data would disagree on it; the ETag covers everything else
+    del info["dataset_version"]
+    etag = make_etag(json.dumps(info, separators=(",", ":")).encode())
+    _info_cache = (snapshot.version, body, etag)
+    return body, etag
+
+@router.get("/info")
+async def get_dataset_info(if_none_match: Optional[str] = Header(None),
+                           data_loader=Depends(get_data_loader)):
+    """
+    Get the Titanic dataset's schema and column profile.
+    
+    The response carries a strong ETag that changes with the dataset's
+    contents; send it back in If-None-Match to get a 304 while it is current.
+    """
+    body, etag = dataset_info(data_loader.snapshot)
+    headers = {"ETag": etag, "Cache-Control": cache_control(INFO_MAX_AGE)}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency rejecting requests without the configured admin token.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def describe_dataset(data_loader) -> Dict[str, Any]:
+    """
+    Summarize the dataset snapshot currently being served.
+    """
+    snapshot = data_loader.snapshot
+    return {
+        "version": snapshot.version,
+        "fingerprint": snapshot.fingerprint,
+        "storage": snapshot.storage_used,
+        "rows": len(snapshot.df),
+        "loaded_at": snapshot.loaded_at,
     }
+
+def reload_dataset(data_loader):
+    """
+    Reload the dataset, keeping the current snapshot if loading fails.
+    """
+    try:
+        data_loader.load_data()
+    except Exception as e:
+        print(f"Dataset reload failed, keeping version {data_loader.version}: {e}")
+
+@router.get("/admin/dataset", dependencies=[Depends(require_admin)])
+async def get_dataset_status(data_loader=Depends(get_data_loader)):
+    """
+    Report the version of the dataset currently being served.
+    """
+    return describe_dataset(data_loader)
+
+@router.post("/admin/reload", status_code=202, dependencies=[Depends(require_admin)])
+async def reload_dataset_in_background(background_tasks: BackgroundTasks,
+                                       data_loader=Depends(get_data_loader)):
+    """
+    Reload the dataset in the background.
     
-    return info
\ No newline at end of file
+    Requests keep being served from the current snapshot until the new one
+    is swapped in; poll /admin/dataset to see when the version changes.
+    """
+    background_tasks.add_task(reload_dataset, data_loader)
+    return {"status": "reloading", "current": describe_dataset(data_loader)}
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import routes with deployment compatibility
@@ -13,15 +16,96 @@ if backend_path not in sys.path:
 # Try absolute import first (for Render deployment)
 try:
     from backend.api.routes import router as api_router
+    from backend.utils.answer_cache import create_answer_cache
+    from backend.utils.assets import IMMUTABLE_CACHE_CONTROL, plotlyjs_bundle, plotlyjs_version
+    from backend.utils.compression import COMPRESSION_ENABLED, CompressionMiddleware, choose_encoding
+    from backend.utils.executor import query_executor
+    from backend.utils.http_cache import etag_matches
+    from backend.utils.metrics import MetricsMiddleware, metrics
 except ImportError:
     # Fallback to relative import (for local development)
     from api.routes import router as api_router
+    from utils.answer_cache import create_answer_cache
+    from utils.assets import IMMUTABLE_CACHE_CONTROL, plotlyjs_bundle, plotlyjs_version
+    from utils.compression import COMPRESSION_ENABLED, CompressionMiddleware, choose_encoding
+    from utils.executor import query_executor
+    from utils.http_cache import etag_matches
+    from utils.metrics import MetricsMiddleware, metrics
+
+# Render the default charts at startup unless disabled
+PREWARM_CHARTS = os.environ.get("PREWARM_CHARTS", "true").lower() in ("1", "true", "yes")
+
+# Seconds between checks of the dataset file for changes; 0 disables watching
+DATASET_WATCH_INTERVAL = float(os.environ.get("DATASET_WATCH_INTERVAL", 0))
+
+def register_collectors(data_loader, visualizer, answer_cache):
+    """
+    Report the dataset version and cache statistics on every scrape.
+    """
+    def collect():
+        snapshot = data_loader.snapshot
+        yield "titanic_dataset_version", "gauge", "Version of the dataset being served.", snapshot.version
+        yield "titanic_dataset_rows", "gauge", "Rows in the dataset being served.", snapshot.row_count
+        chart_stats = visualizer.cache.stats()
+        yield "titanic_chart_cache_entries", "gauge", "Charts in the chart cache.", chart_stats["size"]
+        yield "titanic_chart_cache_hits_total", "counter", "Chart cache hits.", chart_stats["hits"]
+        yield "titanic_chart_cache_misses_total", "counter", "Chart cache misses.", chart_stats["misses"]
+        if answer_cache is not None:
+            answer_stats = answer_cache.stats()
+            yield "titanic_answer_cache_entries", "gauge", "Answers in the answer cache.", answer_stats["entries"]
+            yield "titanic_answer_cache_bytes", "gauge", "Size of the cached answers.", answer_stats["bytes"]
+            yield "titanic_answer_cache_hits_total", "counter", "Answer cache hits.", answer_stats["hits"]
+            yield "titanic_answer_cache_misses_total", "counter", "Answer cache misses.", answer_stats["misses"]
+            yield "titanic_answer_cache_evictions_total", "counter", "Answers evicted from the answer cache.", answer_stats["evictions"]
+    
+    metrics.add_collector(collect)
+    return collect
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the dataset and build shared, process-wide state once before
+    serving requests.
+
+    pandas, plotly and langchain are first imported here rather than when
+    this module is imported, so importing the app stays cheap.
+    """
+    try:
+        from backend.models.titanic_agent import get_agent_registry
+        from backend.utils.data_loader import titanic_data
+        from backend.utils.visualizer import titanic_visualizer
+    except ImportError:
+        from models.titanic_agent import get_agent_registry
+        from utils.data_loader import titanic_data
+        from utils.visualizer import titanic_visualizer
+
+    titanic_data.load_data()
+    app.state.agent_registry = get_agent_registry()
+    if PREWARM_CHARTS:
+        titanic_visualizer.prewarm()
+    app.state.query_executor = query_executor
+    # Answers cached for any other dataset are dropped now and on reload
+    answer_cache = create_answer_cache()
+    invalidate_answers = lambda snapshot: answer_cache.invalidate(snapshot.fingerprint)
+    if answer_cache is not None:
+        invalidate_answers(titanic_data.snapshot)
+        titanic_data.add_reload_listener(invalidate_answers)
+    app.state.answer_cache = answer_cache
+    app.state.metrics_collector = register_collectors(titanic_data, titanic_visualizer, answer_cache)
+    if DATASET_WATCH_INTERVAL > 0:
+        titanic_data.start_watching(DATASET_WATCH_INTERVAL)
+    yield
+    titanic_data.stop_watching()
+    titanic_data.remove_reload_listener(invalidate_answers)
+    metrics.remove_collector(app.state.metrics_collector)
+    query_executor.shutdown()
 
 # Create the FastAPI app
 app = FastAPI(
     title="Titanic Dataset Chatbot API",
     description="An API that allows users to ask questions about the Titanic dataset in natural language",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow requests from the frontend
@@ -33,9 +117,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large and streamed responses for clients that accept it
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Count requests and record their latency and response size. Added last, so
+# it runs first and sees the bytes actually sent.
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include the API routes
 app.include_router(api_router, prefix="/api/v1")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metrics in the Prometheus text exposition format.
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/static/plotly-{version}.min.js")
+def get_plotlyjs(version: str, accept_encoding: str = Header(""),
+                 if_none_match: Optional[str] = Header(None)):
+    """
+    The plotly.js bundle of the installed plotly package, referenced by
+    chart HTML. The URL is versioned, so it is cached as immutable; the
+    compressed variants are built once.
+    """
+    if version != plotlyjs_version():
+        raise HTTPException(status_code=404, detail=f"plotly.js {version} is not available")
+    bundle, etag = plotlyjs_bundle()
+    encoding = choose_encoding(accept_encoding) or "identity"
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if encoding == "identity":
+        headers["ETag"] = etag
+    else:
+        headers["ETag"] = etag[:-1] + f'-{encoding}"'
+        headers["Content-Encoding"] = encoding
+    if etag_matches(if_none_match, etag) or etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=bundle[encoding], media_type="application/javascript", headers=headers)
+
 @app.get("/")
 async def root():
     """
@@ -44,9 +168,17 @@ async def root():
     return {
         "message": "Welcome to the Titanic Dataset Chatbot API!",
         "endpoints": {
-            "ask": "/api/v1/ask (POST)",
+            "ask": "/api/v1/ask (POST, or GET with ?query=)",
+            "ask_stream": "/api/v1/ask/stream (POST, NDJSON)",
+            "ask_batch": "/api/v1/ask/batch (POST)",
+            "cache": "/api/v1/cache (GET)",
             "health": "/api/v1/health (GET)",
-            "info": "/api/v1/info (GET)"
+            "info": "/api/v1/info (GET)",
+            "llm": "/api/v1/llm (GET)",
+            "metrics": "/metrics (GET)",
+            "plotlyjs": "/static/plotly-<version>.min.js (GET)",
+            "admin_reload": "/api/v1/admin/reload (POST, X-Admin-Token)",
+            "admin_dataset": "/api/v1/admin/dataset (GET, X-Admin-Token)"
         },
         "description": "Send natural language questions about the Titanic dataset to /api/v1/ask"
     }
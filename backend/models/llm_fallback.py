@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Import our utilities
+# Handle deployment vs local imports
+try:
+    from backend.utils.answer_cache import AnswerCache, SqliteAnswerStore
+    from backend.utils.metrics import metrics, stage_timer
+    from backend.models.router import normalize_query
+except ImportError:
+    # Fallback for local development
+    from ..utils.answer_cache import AnswerCache, SqliteAnswerStore
+    from ..utils.metrics import metrics, stage_timer
+    from .router import normalize_query
+
+# Ask a language model the questions the keyword tools can't parse. Off
+# unless enabled; needs the openai package.
+LLM_FALLBACK = os.environ.get("LLM_FALLBACK", "false").lower() in ("1", "true", "yes")
+
+# Any OpenAI-compatible chat completions endpoint, e.g. a local server at
+# http://localhost:8001/v1
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "https://api.openai.com/v1")
+LLM_API_KEY = os.environ.get("LLM_API_KEY", os.environ.get("OPENAI_API_KEY", ""))
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+
+# Most completions requested at the same time per process; further
+# questions wait up to LLM_QUEUE_TIMEOUT seconds for a slot, then get the
+# keyword tools' answer
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 5))
+
+# Seconds a single completion may take, and its maximum length in tokens
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 15))
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", 300))
+
+# SQLite file caching completions across restarts and worker processes,
+# and how long they stay valid in seconds (0 = until evicted)
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "llm_cache.sqlite3")
+)
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 10000))
+
+SYSTEM_PROMPT = (
+    "You answer questions about the Titanic passenger dataset. The dataset's "
+    "columns are profiled below as JSON. Answer in at most three sentences. "
+    "If the profile doesn't contain what is needed, say which question about "
+    "the columns you can answer instead; never invent numbers.\n\n{profile}"
+)
+
+LLM_REQUESTS_TOTAL = metrics.counter(
+    "titanic_llm_requests_total",
+    "Questions passed to the language model, by outcome.",
+    ["outcome"]
+)
+LLM_TOKENS_TOTAL = metrics.counter(
+    "titanic_llm_tokens_total",
+    "Tokens used by language model completions, by kind.",
+    ["kind"]
+)
+
+
+@dataclass
+class LLMAnswer:
+    """
+    Answer from the language model.
+
+    Attributes:
+        text: Text answer for the user
+        model: Model that produced it
+        cached: Whether it came from the cache rather than a completion
+    """
+    text: str
+    model: str
+    cached: bool = False
+
+
+class LLMFallback:
+    """
+    Answers questions with a language model behind an OpenAI-compatible API.
+
+    At most max_concurrency completions run at once, each bounded by the
+    timeout. Completions are cached on the normalized question, the model
+    and the dataset fingerprint, so rephrasings of a question share one
+    completion and a changed dataset gets fresh ones.
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: str = LLM_API_KEY,
+                 model: str = LLM_MODEL, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT, timeout: float = LLM_TIMEOUT,
+                 max_tokens: int = LLM_MAX_TOKENS, cache: Optional[AnswerCache] = None):
+        """
+        Initialize the fallback.
+
+        Args:
+            base_url: Base URL of the API, ending in /v1
+            api_key: API key; local servers usually accept any value
+            model: Model name sent with each request
+            max_concurrency: Most completions requested at the same time
+            queue_timeout: Seconds to wait for a free slot
+            timeout: Seconds a completion may take
+            max_tokens: Maximum completion length
+            cache: Cache of completions, or None to always ask the model
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.outcomes: Dict[str, int] = {}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The OpenAI client, created on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    # Retries would multiply the latency of a slow server
+                    self._client = OpenAI(base_url=self.base_url, api_key=self.api_key or "none",
+                                          timeout=self.timeout, max_retries=0)
+        return self._client
+
+    def _count(self, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        LLM_REQUESTS_TOTAL.inc(outcome)
+        if prompt_tokens or completion_tokens:
+            LLM_TOKENS_TOTAL.inc("prompt", amount=prompt_tokens)
+            LLM_TOKENS_TOTAL.inc("completion", amount=completion_tokens)
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def cache_key(self, query: str, snapshot) -> str:
+        return f"{snapshot.fingerprint}:{self.model}:{normalize_query(query)}"
+
+    def answer(self, query: str, snapshot) -> Optional[LLMAnswer]:
+        """
+        Answer a question about a dataset snapshot.
+
+        Args:
+            query: The user's question
+            snapshot: DatasetSnapshot whose profile is given to the model
+
+        Returns:
+            The answer, or None if no slot became free in time or the
+            completion failed
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(query, snapshot)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cached")
+                return LLMAnswer(cached["text"], cached["model"], cached=True)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("busy")
+            return None
+        try:
+            with stage_timer("llm"):
+                completion = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT.format(
+                            profile=json.dumps(snapshot.profile, separators=(",", ":"), default=str))},
+                        {"role": "user", "content": query},
+                    ],
+                    max_tokens=self.max_tokens,
+                    temperature=0,
+                )
+        except Exception as e:
+            self._count("timeout" if "timeout" in type(e).__name__.lower() else "error")
+            print(f"LLM fallback failed: {e}")
+            return None
+        finally:
+            self._slots.release()
+
+        usage = completion.usage
+        self._count(
+            "success",
+            usage.prompt_tokens if usage is not None else 0,
+            usage.completion_tokens if usage is not None else 0,
+        )
+        text = (completion.choices[0].message.content or "").strip() if completion.choices else ""
+        if not text:
+            return None
+        model = completion.model or self.model
+        if key is not None:
+            self.cache.put(key, {"text": text, "model": model})
+        return LLMAnswer(text, model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the outcome and token counters and the cache's size."""
+        with self._lock:
+            stats = {
+                'model': self.model,
+                'max_concurrency': self.max_concurrency,
+                'requests': dict(self.outcomes),
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+            }
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+
+def create_llm_fallback(enabled: bool = LLM_FALLBACK) -> Optional[LLMFallback]:
+    """
+    Create the LLM fallback with its persistent cache.
+
+    Returns:
+        The fallback, or None when it is disabled
+    """
+    if not enabled:
+        return None
+    cache = AnswerCache(
+        SqliteAnswerStore(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES),
+        ttl=LLM_CACHE_TTL,
+    )
+    return LLMFallback(cache=cache)
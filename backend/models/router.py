@@ -0,0 +1,316 @@
+import functools
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Words and symbols a query is split into; "%" is kept as its own token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|%")
+
+# The same split for ASCII queries as a translation table, which is faster:
+# letters and digits are kept, "%" is spaced out, anything else is a space
+ASCII_TOKEN_TABLE = str.maketrans({
+    chr(code): chr(code) if chr(code).isalnum() else " % " if chr(code) == "%" else " "
+    for code in range(128)
+})
+
+# Intents in priority order: when a query has keywords for several intents,
+# the first one listed wins. "analysis" is the fallback.
+INTENTS = ["percentage", "average", "count", "histogram", "analysis"]
+INTENT_RANKS = {name: rank for rank, name in enumerate(INTENTS)}
+
+# Columns whose questions default to an average when no intent is named
+NUMERIC_COLUMNS = ['Age', 'Fare', 'SibSp', 'Parch']
+
+# Phrase -> tags. A tag is ("intent", name), ("statistic", name),
+# ("column", name), ("value", (column, value)) or ("group", None); a group
+# tag makes the categorical columns mentioned after it group-by columns.
+# Phrases match whole tokens only, so "female" never matches "male" and
+# "average" never matches "age".
+LEXICON = {
+    # Intents
+    "percentage": [("intent", "percentage")],
+    "percent": [("intent", "percentage")],
+    "%": [("intent", "percentage")],
+    "proportion": [("intent", "percentage")],
+    "fraction": [("intent", "percentage")],
+    "share": [("intent", "percentage")],
+    "rate": [("intent", "percentage")],
+    "survival rate": [("intent", "percentage"), ("value", ("Survived", 1))],
+    "count": [("intent", "count")],
+    "how many": [("intent", "count")],
+    "number": [("intent", "count")],
+    "average": [("intent", "average")],
+    "mean": [("intent", "average")],
+    "avg": [("intent", "average")],
+    "median": [("intent", "average"), ("statistic", "median")],
+    "histogram": [("intent", "histogram")],
+    "distribution": [("intent", "histogram")],
+    "ages": [("intent", "histogram"), ("column", "Age")],
+    # Grouping
+    "by": [("group", None)],
+    "per": [("group", None)],
+    "each": [("group", None)],
+    "vs": [("group", None)],
+    "versus": [("group", None)],
+    "compared": [("group", None)],
+    "between": [("group", None)],
+    "across": [("group", None)],
+    # Sex
+    "sex": [("column", "Sex")],
+    "gender": [("column", "Sex")],
+    "male": [("value", ("Sex", "male"))],
+    "males": [("value", ("Sex", "male"))],
+    "man": [("value", ("Sex", "male"))],
+    "men": [("value", ("Sex", "male"))],
+    "female": [("value", ("Sex", "female"))],
+    "females": [("value", ("Sex", "female"))],
+    "woman": [("value", ("Sex", "female"))],
+    "women": [("value", ("Sex", "female"))],
+    "ladies": [("value", ("Sex", "female"))],
+    # Survival
+    "survival": [("column", "Survived")],
+    "survived": [("value", ("Survived", 1))],
+    "survive": [("value", ("Survived", 1))],
+    "survivor": [("value", ("Survived", 1))],
+    "survivors": [("value", ("Survived", 1))],
+    "surviving": [("value", ("Survived", 1))],
+    "died": [("value", ("Survived", 0))],
+    "die": [("value", ("Survived", 0))],
+    "dead": [("value", ("Survived", 0))],
+    "perished": [("value", ("Survived", 0))],
+    "deaths": [("value", ("Survived", 0))],
+    "non survivors": [("value", ("Survived", 0))],
+    "did not survive": [("value", ("Survived", 0))],
+    "didn t survive": [("value", ("Survived", 0))],
+    # Passenger class
+    "class": [("column", "Pclass")],
+    "pclass": [("column", "Pclass")],
+    "ticket class": [("column", "Pclass")],
+    "first class": [("value", ("Pclass", 1))],
+    "1st class": [("value", ("Pclass", 1))],
+    "second class": [("value", ("Pclass", 2))],
+    "2nd class": [("value", ("Pclass", 2))],
+    "third class": [("value", ("Pclass", 3))],
+    "3rd class": [("value", ("Pclass", 3))],
+    # Port of embarkation
+    "embark": [("column", "Embarked")],
+    "embarked": [("column", "Embarked")],
+    "embarkation": [("column", "Embarked")],
+    "boarded": [("column", "Embarked")],
+    "port": [("column", "Embarked")],
+    "ports": [("column", "Embarked")],
+    "southampton": [("value", ("Embarked", "S"))],
+    "s port": [("value", ("Embarked", "S"))],
+    "cherbourg": [("value", ("Embarked", "C"))],
+    "c port": [("value", ("Embarked", "C"))],
+    "queenstown": [("value", ("Embarked", "Q"))],
+    "q port": [("value", ("Embarked", "Q"))],
+    # Numeric columns
+    "age": [("column", "Age")],
+    "old": [("column", "Age")],
+    "fare": [("column", "Fare")],
+    "fares": [("column", "Fare")],
+    "price": [("column", "Fare")],
+    "ticket price": [("column", "Fare")],
+    "siblings": [("column", "SibSp")],
+    "spouses": [("column", "SibSp")],
+    "sibsp": [("column", "SibSp")],
+    "parents": [("column", "Parch")],
+    "children": [("column", "Parch")],
+    "parch": [("column", "Parch")],
+}
+
+
+def tokenize(query: str) -> List[str]:
+    """Split a query into lowercase word tokens in a single pass."""
+    query = query.lower()
+    if query.isascii():
+        return query.translate(ASCII_TOKEN_TABLE).split()
+    return TOKEN_PATTERN.findall(query)
+
+
+class Route(NamedTuple):
+    """
+    How a query should be answered. A named tuple rather than a frozen
+    dataclass, which takes several times longer to construct.
+
+    Attributes:
+        intent: One of INTENTS
+        column: Column the query is about, if any
+        value: Value of that column the query is about, if any
+        values: Every (column, value) pair mentioned, in query order
+        columns: Every column mentioned, in query order
+        filters: (column, value) pairs the answer is restricted to
+        group_by: Columns the answer is broken down by
+        statistic: "mean" or "median" for average questions
+    """
+    intent: str
+    column: Optional[str] = None
+    value: Any = None
+    values: Tuple[Tuple[str, Any], ...] = ()
+    columns: Tuple[str, ...] = ()
+    filters: Tuple[Tuple[str, Any], ...] = ()
+    group_by: Tuple[str, ...] = ()
+    statistic: str = "mean"
+
+
+class IntentRouter:
+    """
+    Routes queries with a phrase table compiled once up front.
+
+    Single-word phrases are looked up directly by token; multi-word phrases
+    are indexed by their first token, longest first. A query is tokenized
+    once and scanned left to right taking the longest phrase that matches at
+    each position.
+    """
+
+    def __init__(self, lexicon: Dict[str, List[Tuple[str, Any]]] = None):
+        """
+        Compile the phrase table.
+
+        Args:
+            lexicon: Mapping of phrase to tags. Defaults to LEXICON.
+        """
+        if lexicon is None:
+            lexicon = LEXICON
+        self._words = {}
+        self._phrases = {}
+        for phrase, tags in lexicon.items():
+            first, *rest = tokenize(phrase)
+            if rest:
+                self._phrases.setdefault(first, []).append((tuple(rest), tuple(tags)))
+            else:
+                self._words[first] = tuple(tags)
+        for candidates in self._phrases.values():
+            candidates.sort(key=lambda candidate: -len(candidate[0]))
+
+        # Phrases with identical tags are synonyms; each folds to the first
+        # one listed. Multi-word phrases are joined with "_", which never
+        # occurs in a token, so they can't be confused with unmatched words.
+        self._canonical = {}
+        for phrase, tags in lexicon.items():
+            self._canonical.setdefault(tuple(tags), "_".join(tokenize(phrase)))
+
+    def _scan(self, tokens: List[str]) -> List[Tuple[int, int, Tuple[Tuple[str, Any], ...]]]:
+        """
+        Scan the tokens left to right and return (start, end, tags) for the
+        longest phrase matching at each position; tokens that start no
+        phrase are skipped.
+        """
+        words = self._words
+        phrases = self._phrases
+        found = []
+        i = 0
+        count = len(tokens)
+        while i < count:
+            start = i
+            token = tokens[i]
+            i += 1
+            tags = words.get(token)
+            for rest, phrase_tags in phrases.get(token, ()):
+                if tuple(tokens[i:i + len(rest)]) == rest:
+                    tags = phrase_tags
+                    i += len(rest)
+                    break
+            if tags is not None:
+                found.append((start, i, tags))
+        return found
+
+    def normalize(self, query: str) -> str:
+        """
+        Return a canonical form of a query: every phrase the router matches
+        replaced by the first phrase with the same tags, other words kept
+        as they are. Queries with the same canonical form are routed alike,
+        so e.g. "How many WOMEN?" and "how many females" normalize alike
+        while "non survivors" and "non survived" do not.
+        """
+        tokens = tokenize(query)
+        words = []
+        i = 0
+        for start, end, tags in self._scan(tokens):
+            words.extend(tokens[i:start])
+            words.append(self._canonical[tags])
+            i = end
+        words.extend(tokens[i:])
+        return " ".join(words)
+
+    def match(self, tokens: List[str]) -> List[Tuple[str, Any]]:
+        """Return the tags of every phrase found in the tokens, in order."""
+        return [tag for _, _, tags in self._scan(tokens) for tag in tags]
+
+    def route(self, query: str) -> Route:
+        """
+        Pick the intent of a query and the column and value it is about.
+
+        Args:
+            query: The user's question
+
+        Returns:
+            Route for the query
+        """
+        # Dictionaries serve as ordered sets
+        intent = None
+        intent_rank = len(INTENTS)
+        statistic = "mean"
+        values = {}
+        columns = {}
+        group_by = {}
+        value_counts = {}
+        grouping = False
+        for _, _, tags in self._scan(tokenize(query)):
+            for kind, payload in tags:
+                if kind == "value":
+                    column = payload[0]
+                    if payload not in values:
+                        values[payload] = None
+                        value_counts[column] = value_counts.get(column, 0) + 1
+                elif kind == "column":
+                    column = payload
+                else:
+                    if kind == "intent":
+                        rank = INTENT_RANKS[payload]
+                        if rank < intent_rank:
+                            intent, intent_rank = payload, rank
+                    elif kind == "statistic":
+                        statistic = payload
+                    elif kind == "group":
+                        grouping = True
+                    continue
+                columns[column] = None
+                if grouping and column not in NUMERIC_COLUMNS:
+                    group_by[column] = None
+
+        # Several values of one column, as in "men and women", compare them
+        if len(values) > len(value_counts):
+            for column in columns:
+                if value_counts.get(column, 0) > 1:
+                    group_by[column] = None
+        values = tuple(values)
+        columns = tuple(columns)
+        group_by = tuple(group_by)
+        filters = tuple([value for value in values if value[0] not in group_by]) if group_by else values
+
+        if intent is None:
+            # A bare numeric column, as in "what about the fare?", asks for its average
+            intent = "average" if columns and columns[0] in NUMERIC_COLUMNS else "analysis"
+
+        column, value = values[0] if values else (columns[0] if columns else None, None)
+        if intent == "average":
+            column = next((name for name in columns if name in NUMERIC_COLUMNS), None)
+            value = None
+        return Route(intent, column, value, values, columns, filters, group_by, statistic)
+
+
+# Create a global instance for easy access
+intent_router = IntentRouter()
+
+
+@functools.lru_cache(maxsize=1024)
+def route_query(query: str) -> Route:
+    """Route a query with the shared router, caching recent results."""
+    return intent_router.route(query)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+    """Normalize a query with the shared router, caching recent results."""
+    return intent_router.normalize(query)
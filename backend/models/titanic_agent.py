@@ -1,273 +1,454 @@
-from langchain.tools import BaseTool
-from langchain_core.tools import Tool
-from langchain_openai import OpenAI
-from langchain_experimental.agents import create_pandas_dataframe_agent
-from typing import Optional
-from pydantic import Field, BaseModel
-import re
+from langchain_core.tools import BaseTool
+from typing import Any, Dict, Iterator, Optional
+from dataclasses import dataclass
+import math
+import threading
 
 # Import our utilities
 # Handle deployment vs local imports
 try:
     from backend.utils.data_loader import titanic_data
-    from backend.utils.visualizer import titanic_visualizer
+    from backend.utils.visualizer import Chart, titanic_visualizer
+    from backend.utils.executor import query_executor
+    from backend.utils.metrics import QUERIES_TOTAL, stage_timer
+    from backend.utils.query_engine import QuerySpec, aggregate_key
+    from backend.models.router import route_query
+    from backend.models.llm_fallback import create_llm_fallback
 except ImportError:
     # Fallback for local development
     from ..utils.data_loader import titanic_data
-    from ..utils.visualizer import titanic_visualizer
+    from ..utils.visualizer import Chart, titanic_visualizer
+    from ..utils.executor import query_executor
+    from ..utils.metrics import QUERIES_TOTAL, stage_timer
+    from ..utils.query_engine import QuerySpec, aggregate_key
+    from .router import route_query
+    from .llm_fallback import create_llm_fallback
+
+
+@dataclass
+class ToolResult:
+    """
+    Answer produced by a tool.
+    
+    Attributes:
+        text: Text answer for the user
+        figure: Chart to show alongside the text, if any
+        data: Raw values behind the answer, if any
+        success: False if the tool failed to compute an answer
+        understood: False if the tool couldn't make sense of the query
+    """
+    text: str
+    figure: Optional[Chart] = None
+    data: Optional[Dict[str, Any]] = None
+    success: bool = True
+    understood: bool = True
+
+
+# How each column value is described in answers
+VALUE_LABELS = {
+    ("Sex", "male"): "male passengers",
+    ("Sex", "female"): "female passengers",
+    ("Survived", 1): "passengers who survived",
+    ("Survived", 0): "passengers who died",
+    ("Pclass", 1): "passengers in first class",
+    ("Pclass", 2): "passengers in second class",
+    ("Pclass", 3): "passengers in third class",
+    ("Embarked", "S"): "passengers who embarked from Southampton",
+    ("Embarked", "C"): "passengers who embarked from Cherbourg",
+    ("Embarked", "Q"): "passengers who embarked from Queenstown",
+}
+VALUE_PREDICATES = {
+    ("Sex", "male"): "were male",
+    ("Sex", "female"): "were female",
+    ("Survived", 1): "survived",
+    ("Survived", 0): "died",
+    ("Pclass", 1): "were in first class",
+    ("Pclass", 2): "were in second class",
+    ("Pclass", 3): "were in third class",
+    ("Embarked", "S"): "embarked from Southampton",
+    ("Embarked", "C"): "embarked from Cherbourg",
+    ("Embarked", "Q"): "embarked from Queenstown",
+}
+# Names of values in breakdowns, in display order
+VALUE_NAMES = {
+    ("Sex", "male"): "Male",
+    ("Sex", "female"): "Female",
+    ("Survived", 1): "Survived",
+    ("Survived", 0): "Died",
+    ("Pclass", 1): "First Class",
+    ("Pclass", 2): "Second Class",
+    ("Pclass", 3): "Third Class",
+    ("Embarked", "S"): "Southampton (S)",
+    ("Embarked", "C"): "Cherbourg (C)",
+    ("Embarked", "Q"): "Queenstown (Q)",
+}
+COLUMN_NAMES = {"Sex": "sex", "Pclass": "passenger class", "Embarked": "port of embarkation", "Survived": "survival"}
+COLUMN_TITLES = {"Sex": "Passenger sex", "Pclass": "Passenger class", "Embarked": "Port of embarkation", "Survived": "Survival"}
+# Numeric columns: their name, the word linking it to the passengers it
+# describes, and how values are formatted
+NUMERIC_DESCRIPTIONS = {
+    "Age": ("age", "of", "{:.2f} years"),
+    "Fare": ("ticket fare", "paid by", "${:.2f}"),
+    "SibSp": ("number of siblings and spouses aboard", "for", "{:.2f}"),
+    "Parch": ("number of parents and children aboard", "for", "{:.2f}"),
+}
+PORT_NAMES = {"S": "Southampton", "C": "Cherbourg", "Q": "Queenstown"}
+CLASS_NAMES = {1: "first", 2: "second", 3: "third"}
+_VALUE_ORDER = {key: position for position, key in enumerate(VALUE_NAMES)}
+
+
+def describe_passengers(filters) -> str:
+    """Describe the passengers matching (column, value) filters."""
+    if not filters:
+        return "passengers"
+    if len(filters) == 1:
+        return VALUE_LABELS[filters[0]]
+    return "passengers who " + " and ".join(VALUE_PREDICATES[f] for f in filters)
+
+
+def describe_columns(columns) -> str:
+    """Describe group-by columns, e.g. "sex and passenger class"."""
+    return " and ".join(COLUMN_NAMES.get(column, column) for column in columns)
+
+
+def group_name(row: Dict[str, Any], group_by) -> str:
+    """Name the group of a query result row, e.g. "First Class, Female"."""
+    return ", ".join(VALUE_NAMES.get((column, row[column]), f"{column} {row[column]}") for column in group_by)
+
+
+def sort_groups(rows, group_by):
+    """Order query result rows by the display order of their group values."""
+    return sorted(rows, key=lambda row: tuple(
+        (_VALUE_ORDER.get((column, row[column]), len(_VALUE_ORDER)), str(row[column])) for column in group_by
+    ))
+
+
+def breakdown(column: str, filters=(), group_by=()) -> ToolResult:
+    """
+    Describe how passengers matching the filters split across the values
+    of a column, separately for each group if group_by is given.
+    """
+    counts = sort_groups(titanic_data.query(QuerySpec(filters, tuple(group_by) + (column,))), tuple(group_by) + (column,))
+    totals = {
+        tuple(row[c] for c in group_by): row["count"]
+        for row in titanic_data.query(QuerySpec(filters, tuple(group_by)))
+    }
+    title = COLUMN_TITLES.get(column, column)
+    if not group_by:
+        total = totals[()]
+        lines = [
+            f"{group_name(row, (column,))}: {row['count'] / total * 100:.2f}% ({row['count']} passengers)"
+            for row in counts
+        ]
+        return ToolResult(f"{title} breakdown:\n" + "\n".join(lines), data={"counts": {row[column]: row["count"] for row in counts}})
+    
+    lines = {}
+    for row in counts:
+        group = tuple(row[c] for c in group_by)
+        share = f"{group_name(row, (column,))}: {row['count'] / totals[group] * 100:.2f}%"
+        lines.setdefault(group_name(row, group_by), []).append(share)
+    text = f"{title} breakdown by {describe_columns(group_by)}:\n" + "\n".join(
+        f"{name}: {', '.join(shares)}" for name, shares in lines.items()
+    )
+    return ToolResult(text, data={"groups": counts})
 
 
 class PassengerPercentageTool(BaseTool):
     name: str = "passenger_percentage_calculator"
     description: str = "Calculate the percentage of passengers with a specific characteristic. Input should be a dictionary with 'column' and 'value' keys."
 
-    def _run(self, query: str) -> str:
+    def _run(self, query: str) -> ToolResult:
         """Use the tool to calculate passenger percentages."""
         try:
-            # Parse the query to extract column and value
-            # For example: "percentage of male passengers" -> column="Sex", value="male"
-            query_lower = query.lower()
+            # The router extracts the filters, e.g.
+            # "percentage of women who survived" -> Sex=female, Survived=1.
+            # The last one is the outcome, the others define the population.
+            route = route_query(query)
+            if not route.filters:
+                if route.group_by:
+                    return breakdown(route.group_by[-1], group_by=route.group_by[:-1])
+                return ToolResult("I couldn't parse your request. Please ask about passenger percentages in a clearer way.", understood=False)
+            
+            *within, outcome = route.filters
+            spec = QuerySpec((outcome,), route.group_by, (("pct", None),), tuple(within))
+            rows = titanic_data.query(spec)
+            if not route.group_by:
+                percentage = rows[0]["pct"]
+                if not within:
+                    return ToolResult(f"The percentage of {VALUE_LABELS[outcome]} was {percentage:.2f}%", data={"percentage": percentage})
+                return ToolResult(f"{percentage:.2f}% of {describe_passengers(within)} {VALUE_PREDICATES[outcome]}", data={"percentage": percentage})
             
-            # Handle common percentage queries
-            if "male" in query_lower or "men" in query_lower:
-                percentage = titanic_data.calculate_percentage("Sex", "male")
-                return f"The percentage of male passengers was {percentage:.2f}%"
-            elif "female" in query_lower or "women" in query_lower:
-                percentage = titanic_data.calculate_percentage("Sex", "female")
-                return f"The percentage of female passengers was {percentage:.2f}%"
-            elif "survived" in query_lower:
-                percentage = titanic_data.calculate_percentage("Survived", 1)
-                return f"The percentage of passengers who survived was {percentage:.2f}%"
-            elif "died" in query_lower or "perished" in query_lower:
-                percentage = titanic_data.calculate_percentage("Survived", 0)
-                return f"The percentage of passengers who died was {percentage:.2f}%"
-            elif "first class" in query_lower or "1st class" in query_lower:
-                percentage = titanic_data.calculate_percentage("Pclass", 1)
-                return f"The percentage of passengers in first class was {percentage:.2f}%"
-            elif "second class" in query_lower or "2nd class" in query_lower:
-                percentage = titanic_data.calculate_percentage("Pclass", 2)
-                return f"The percentage of passengers in second class was {percentage:.2f}%"
-            elif "third class" in query_lower or "3rd class" in query_lower:
-                percentage = titanic_data.calculate_percentage("Pclass", 3)
-                return f"The percentage of passengers in third class was {percentage:.2f}%"
-            elif "southampton" in query_lower or "s port" in query_lower:
-                percentage = titanic_data.calculate_percentage("Embarked", "S")
-                return f"The percentage of passengers who embarked from Southampton was {percentage:.2f}%"
-            elif "cherbourg" in query_lower or "c port" in query_lower:
-                percentage = titanic_data.calculate_percentage("Embarked", "C")
-                return f"The percentage of passengers who embarked from Cherbourg was {percentage:.2f}%"
-            elif "queenstown" in query_lower or "q port" in query_lower:
-                percentage = titanic_data.calculate_percentage("Embarked", "Q")
-                return f"The percentage of passengers who embarked from Queenstown was {percentage:.2f}%"
-            else:
-                # More general parsing - try to extract column and value
-                # This is a simplified parser - in a real app, you'd want more robust NLP
-                if "sex" in query_lower and ("male" in query_lower or "female" in query_lower):
-                    value = "male" if "male" in query_lower else "female"
-                    percentage = titanic_data.calculate_percentage("Sex", value)
-                    return f"The percentage of {value} passengers was {percentage:.2f}%"
-                
-                return "I couldn't parse your request. Please ask about passenger percentages in a clearer way."
+            lines = [f"{group_name(row, route.group_by)}: {row['pct']:.2f}%" for row in sort_groups(rows, route.group_by)]
+            title = f"Percentage of {describe_passengers(within)} who {VALUE_PREDICATES[outcome]}, by {describe_columns(route.group_by)}"
+            return ToolResult(f"{title}:\n" + "\n".join(lines), data={"groups": rows})
         except Exception as e:
-            return f"Error calculating percentage: {str(e)}"
+            return ToolResult(f"Error calculating percentage: {str(e)}", success=False)
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str) -> ToolResult:
         """Async version of the run method."""
-        raise NotImplementedError("PassengerPercentageTool does not support async")
+        return await query_executor.run(self._run, query)
 
 
 class PassengerCountTool(BaseTool):
     name: str = "passenger_count_tool"
     description: str = "Count the number of passengers with a specific characteristic. Input should describe what to count."
 
-    def _run(self, query: str) -> str:
+    def _run(self, query: str) -> ToolResult:
         """Use the tool to count passengers."""
         try:
-            query_lower = query.lower()
+            route = route_query(query)
+            filters, group_by = route.filters, route.group_by
             
-            # Handle common count queries
-            if "embark" in query_lower and ("southampton" in query_lower or "s port" in query_lower):
-                counts = titanic_data.get_value_counts("Embarked")
-                s_count = counts.get("S", 0)
-                return f"{s_count} passengers embarked from Southampton (S)"
-            elif "embark" in query_lower and ("cherbourg" in query_lower or "c port" in query_lower):
-                counts = titanic_data.get_value_counts("Embarked")
-                c_count = counts.get("C", 0)
-                return f"{c_count} passengers embarked from Cherbourg (C)"
-            elif "embark" in query_lower and ("queenstown" in query_lower or "q port" in query_lower):
-                counts = titanic_data.get_value_counts("Embarked")
-                q_count = counts.get("Q", 0)
-                return f"{q_count} passengers embarked from Queenstown (Q)"
-            elif "embark" in query_lower:
-                counts = titanic_data.get_value_counts("Embarked")
-                s_count = counts.get("S", 0)
-                c_count = counts.get("C", 0)
-                q_count = counts.get("Q", 0)
-                return f"Passengers embarked from: Southampton: {s_count}, Cherbourg: {c_count}, Queenstown: {q_count}"
-            elif "surviv" in query_lower:
-                counts = titanic_data.get_value_counts("Survived")
-                survived_count = counts.get(1, 0)
-                died_count = counts.get(0, 0)
-                return f"Number of survivors: {survived_count}, Number who died: {died_count}"
-            elif "male" in query_lower or "men" in query_lower:
-                counts = titanic_data.get_value_counts("Sex")
-                male_count = counts.get("male", 0)
-                return f"There were {male_count} male passengers"
-            elif "female" in query_lower or "women" in query_lower:
-                counts = titanic_data.get_value_counts("Sex")
-                female_count = counts.get("female", 0)
-                return f"There were {female_count} female passengers"
-            elif "first class" in query_lower or "1st class" in query_lower:
-                counts = titanic_data.get_value_counts("Pclass")
-                first_class_count = counts.get(1, 0)
-                return f"There were {first_class_count} first-class passengers"
-            elif "second class" in query_lower or "2nd class" in query_lower:
-                counts = titanic_data.get_value_counts("Pclass")
-                second_class_count = counts.get(2, 0)
-                return f"There were {second_class_count} second-class passengers"
-            elif "third class" in query_lower or "3rd class" in query_lower:
-                counts = titanic_data.get_value_counts("Pclass")
-                third_class_count = counts.get(3, 0)
-                return f"There were {third_class_count} third-class passengers"
-            else:
-                return "I couldn't parse your request. Please ask about passenger counts in a clearer way."
+            # A column without a value, or survival, is counted per value
+            if not group_by and route.column in COLUMN_NAMES:
+                if not filters or (route.column == "Survived" and filters == ((route.column, route.value),)):
+                    filters, group_by = (), (route.column,)
+            if not filters and not group_by:
+                return ToolResult("I couldn't parse your request. Please ask about passenger counts in a clearer way.", understood=False)
+            
+            rows = titanic_data.query(QuerySpec(filters, group_by))
+            if not group_by:
+                count = rows[0]["count"]
+                column, value = filters[0]
+                if len(filters) == 1 and column == "Embarked":
+                    text = f"{count} passengers embarked from {PORT_NAMES[value]} ({value})"
+                elif len(filters) == 1 and column == "Pclass":
+                    text = f"There were {count} {CLASS_NAMES[value]}-class passengers"
+                else:
+                    text = f"There were {count} {describe_passengers(filters)}"
+                return ToolResult(text, data={"count": count})
+            
+            rows = sort_groups(rows, group_by)
+            if group_by == ("Embarked",) and not filters:
+                counts = {row["Embarked"]: row["count"] for row in rows}
+                return ToolResult(f"Passengers embarked from: Southampton: {counts.get('S', 0)}, Cherbourg: {counts.get('C', 0)}, Queenstown: {counts.get('Q', 0)}", data={"counts": counts})
+            if group_by == ("Survived",) and not filters:
+                counts = {row["Survived"]: row["count"] for row in rows}
+                return ToolResult(f"Number of survivors: {counts.get(1, 0)}, Number who died: {counts.get(0, 0)}", data={"counts": counts})
+            lines = [f"{group_name(row, group_by)}: {row['count']}" for row in rows]
+            return ToolResult(f"Number of {describe_passengers(filters)} by {describe_columns(group_by)}:\n" + "\n".join(lines), data={"groups": rows})
         except Exception as e:
-            return f"Error counting passengers: {str(e)}"
+            return ToolResult(f"Error counting passengers: {str(e)}", success=False)
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str) -> ToolResult:
         """Async version of the run method."""
-        raise NotImplementedError("PassengerCountTool does not support async")
+        return await query_executor.run(self._run, query)
 
 
 class AverageValueTool(BaseTool):
     name: str = "average_value_calculator"
-    description: str = "Calculate average values for numeric columns like age or fare."
+    description: str = "Calculate average or median values of numeric columns like age or fare, optionally for a group of passengers or per group."
 
-    def _run(self, query: str) -> str:
+    def _run(self, query: str) -> ToolResult:
         """Use the tool to calculate averages."""
         try:
-            query_lower = query.lower()
+            route = route_query(query)
+            column = route.column
+            if column not in NUMERIC_DESCRIPTIONS:
+                return ToolResult("I can calculate averages for age, fare and the number of relatives aboard. Please specify which one you're interested in.", understood=False)
+            
+            statistic = route.statistic
+            spec = QuerySpec(route.filters, route.group_by, ((statistic, column),))
+            rows = titanic_data.query(spec)
+            key = aggregate_key(statistic, column)
+            name, connector, value_format = NUMERIC_DESCRIPTIONS[column]
+            label = "average" if statistic == "mean" else statistic
+            passengers = describe_passengers(route.filters)
+            
+            if not route.group_by:
+                value = rows[0][key]
+                if math.isnan(value):
+                    return ToolResult(f"There are no {passengers} with a known {name}.")
+                return ToolResult(f"The {label} {name} {connector} {passengers} was {value_format.format(value)}", data={label: value})
             
-            if "age" in query_lower:
-                avg_age = titanic_data.get_average("Age")
-                return f"The average age of passengers was {avg_age:.2f} years"
-            elif "fare" in query_lower or "ticket price" in query_lower or "price" in query_lower:
-                avg_fare = titanic_data.get_average("Fare")
-                return f"The average ticket fare was ${avg_fare:.2f}"
-            else:
-                return "I can calculate averages for age and fare. Please specify which one you're interested in."
+            lines = [
+                f"{group_name(row, route.group_by)}: {value_format.format(row[key])}"
+                for row in sort_groups(rows, route.group_by) if not math.isnan(row[key])
+            ]
+            title = f"{label.capitalize()} {name} {connector} {passengers}, by {describe_columns(route.group_by)}"
+            return ToolResult(f"{title}:\n" + "\n".join(lines), data={"groups": rows})
         except Exception as e:
-            return f"Error calculating average: {str(e)}"
+            return ToolResult(f"Error calculating average: {str(e)}", success=False)
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str) -> ToolResult:
         """Async version of the run method."""
-        raise NotImplementedError("AverageValueTool does not support async")
+        return await query_executor.run(self._run, query)
 
 
 class AgeHistogramTool(BaseTool):
     name: str = "age_histogram_generator"
     description: str = "Generate a histogram of passenger ages."
 
-    def _run(self, query: str) -> str:
+    def _run(self, query: str) -> ToolResult:
         """Generate age histogram."""
         try:
-            # Generate the age distribution histogram
-            html_fig = titanic_visualizer.create_age_distribution_histogram()
-            return f"I've created a histogram showing the distribution of passenger ages. Here it is:\n{html_fig}"
+            # The figure itself is built when the result is serialized
+            chart = titanic_visualizer.build_age_distribution_histogram()
+            distribution = titanic_data.get_age_distribution()
+            return ToolResult(
+                "I've created a histogram showing the distribution of passenger ages.",
+                figure=chart,
+                data={"histogram": distribution["histogram"]}
+            )
         except Exception as e:
-            return f"Error generating age histogram: {str(e)}"
+            return ToolResult(f"Error generating age histogram: {str(e)}", success=False)
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str) -> ToolResult:
         """Async version of the run method."""
-        raise NotImplementedError("AgeHistogramTool does not support async")
+        return await query_executor.run(self._run, query)
 
 
 class ColumnAnalysisTool(BaseTool):
     name: str = "column_analyzer"
     description: str = "Analyze any column in the dataset to get statistics."
 
-    def _run(self, query: str) -> str:
+    def _run(self, query: str) -> ToolResult:
         """Analyze a column."""
         try:
-            # Extract column name from query
-            query_lower = query.lower()
+            route = route_query(query)
+            # Break down the first column that is not a grouping column
+            columns = [column for column in route.columns if column not in route.group_by]
+            col_name = columns[0] if columns else route.column
+            group_by = tuple(column for column in route.group_by if column != col_name)
+            if col_name in COLUMN_TITLES:
+                filters = tuple(f for f in route.filters if f[0] != col_name)
+                return breakdown(col_name, filters, group_by)
+            elif col_name is not None:
+                stats = titanic_data.get_column_stats(col_name)
+                return ToolResult(f"Statistics for {col_name}: {stats}", data={"stats": stats})
             
-            # Map common phrases to column names
-            column_mapping = {
-                'sex': 'Sex',
-                'gender': 'Sex',
-                'class': 'Pclass',
-                'ticket_class': 'Pclass',
-                'embarked': 'Embarked',
-                'port': 'Embarked',
-                'survived': 'Survived'
-            }
-            
-            for key, col_name in column_mapping.items():
-                if key in query_lower:
-                    stats = titanic_data.get_column_stats(col_name)
-                    
-                    # Format response based on column type
-                    if col_name == 'Sex':
-                        male_pct = titanic_data.calculate_percentage('Sex', 'male')
-                        female_pct = titanic_data.calculate_percentage('Sex', 'female')
-                        return f"Passenger sex breakdown:\nMale: {male_pct:.2f}% ({stats['top_values'].get('male', 0)} passengers)\nFemale: {female_pct:.2f}% ({stats['top_values'].get('female', 0)} passengers)"
-                    elif col_name == 'Pclass':
-                        class1_pct = titanic_data.calculate_percentage('Pclass', 1)
-                        class2_pct = titanic_data.calculate_percentage('Pclass', 2)
-                        class3_pct = titanic_data.calculate_percentage('Pclass', 3)
-                        return f"Passenger class breakdown:\nFirst Class: {class1_pct:.2f}% ({stats['top_values'].get(1, 0)} passengers)\nSecond Class: {class2_pct:.2f}% ({stats['top_values'].get(2, 0)} passengers)\nThird Class: {class3_pct:.2f}% ({stats['top_values'].get(3, 0)} passengers)"
-                    elif col_name == 'Embarked':
-                        s_pct = titanic_data.calculate_percentage('Embarked', 'S')
-                        c_pct = titanic_data.calculate_percentage('Embarked', 'C')
-                        q_pct = titanic_data.calculate_percentage('Embarked', 'Q')
-                        return f"Port of embarkation breakdown:\nSouthampton (S): {s_pct:.2f}% ({stats['top_values'].get('S', 0)} passengers)\nCherbourg (C): {c_pct:.2f}% ({stats['top_values'].get('C', 0)} passengers)\nQueenstown (Q): {q_pct:.2f}% ({stats['top_values'].get('Q', 0)} passengers)"
-                    elif col_name == 'Survived':
-                        survived_pct = titanic_data.calculate_percentage('Survived', 1)
-                        died_pct = titanic_data.calculate_percentage('Survived', 0)
-                        return f"Survival breakdown:\nSurvived: {survived_pct:.2f}% ({stats['top_values'].get(1, 0)} passengers)\nDied: {died_pct:.2f}% ({stats['top_values'].get(0, 0)} passengers)"
-                    else:
-                        return f"Statistics for {col_name}: {stats}"
-                        
-            return "I couldn't identify which column you want analyzed. Try asking about sex, class, embarkation, or survival."
+            return ToolResult("I couldn't identify which column you want analyzed. Try asking about sex, class, embarkation, or survival.", understood=False)
         except Exception as e:
-            return f"Error analyzing column: {str(e)}"
+            return ToolResult(f"Error analyzing column: {str(e)}", success=False)
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str) -> ToolResult:
         """Async version of the run method."""
-        raise NotImplementedError("ColumnAnalysisTool does not support async")
+        return await query_executor.run(self._run, query)
 
 
-def create_titanic_agent():
+class TitanicAgentRegistry:
     """
-    Create and return a simple function to handle Titanic dataset queries.
+    Process-wide holder for the query tools.
+
+    The tools keep no per-request state, so one instance of each is built at
+    startup and shared by every request and thread.
     """
-    # Just return a simple function that can handle queries directly
-    def simple_query_handler(query: str) -> str:
+
+    def __init__(self):
+        self.percentage_tool = PassengerPercentageTool()
+        self.count_tool = PassengerCountTool()
+        self.avg_tool = AverageValueTool()
+        self.hist_tool = AgeHistogramTool()
+        self.analysis_tool = ColumnAnalysisTool()
+        self.tools = {
+            "percentage": self.percentage_tool,
+            "count": self.count_tool,
+            "average": self.avg_tool,
+            "histogram": self.hist_tool,
+            "analysis": self.analysis_tool,
+        }
+        # Language model for the queries no tool understands, if enabled
+        self.llm_fallback = create_llm_fallback()
+        self.handler = create_titanic_agent(self)
+    
+    def route(self, query: str) -> BaseTool:
+        """
+        Pick the tool that should answer a query.
+        """
+        return self.tools[route_query(query).intent]
+    
+    def answer(self, query: str) -> ToolResult:
+        """
+        Answer a query with the tool picked by route().
+        
+        The whole answer, including any chart built later, uses the dataset
+        snapshot current when the query started, even if it is reloaded
+        meanwhile.
+        
+        When the tool doesn't understand the query and the LLM fallback is
+        enabled, the language model answers instead; if it can't, the
+        tool's answer is returned.
         """
-        Handle queries using our tools directly without needing a complex LLM.
+        with titanic_data.pinned():
+            with stage_timer("routing"):
+                tool = self.route(query)
+            try:
+                with stage_timer("tool"):
+                    result = tool._run(query)
+            except Exception:
+                QUERIES_TOTAL.inc(tool.name, "error")
+                raise
+            QUERIES_TOTAL.inc(tool.name, "success" if result.success else "failure")
+            if not result.understood and self.llm_fallback is not None:
+                answer = self.llm_fallback.answer(query, titanic_data.snapshot)
+                if answer is not None:
+                    return ToolResult(answer.text, data={"source": "llm", "model": answer.model})
+        return result
+    
+    def stream(self, query: str, visualization_format: str = "html") -> Iterator[Dict[str, Any]]:
         """
-        # Try to identify what type of query this is and use the appropriate tool
-        query_lower = query.lower()
+        Answer a query as a sequence of events.
         
-        # Create instances of our tools
-        percentage_tool = PassengerPercentageTool()
-        count_tool = PassengerCountTool()
-        avg_tool = AverageValueTool()
-        hist_tool = AgeHistogramTool()
-        analysis_tool = ColumnAnalysisTool()
+        The text answer is yielded as soon as it is known; a chart is only
+        rendered after that, and yielded as a separate "visualization" event.
         
-        # Route to appropriate tool based on query content
-        if "percentage" in query_lower or "%" in query_lower:
-            return percentage_tool._run(query)
-        elif "count" in query_lower or "how many" in query_lower or "number" in query_lower:
-            return count_tool._run(query)
-        elif "average" in query_lower or "mean" in query_lower or "fare" in query_lower:
-            return avg_tool._run(query)
-        elif "histogram" in query_lower or "distribution" in query_lower or "ages" in query_lower:
-            return hist_tool._run(query)
-        else:
-            # Default to column analysis for general queries
-            return analysis_tool._run(query)
+        Args:
+            query: The user's question
+            visualization_format: "html" or "json", see Chart.render
+            
+        Yields:
+            Dictionaries with a "type" of "text", "visualization" or "error".
+            The text event's "understood" is ToolResult.understood.
+        """
+        result = self.answer(query)
+        if not result.success:
+            yield {"type": "error", "text_response": result.text}
+            return
+        yield {"type": "text", "text_response": result.text, "data": result.data, "understood": result.understood}
+        if result.figure is not None:
+            try:
+                yield {
+                    "type": "visualization",
+                    "visualization": result.figure.render(visualization_format),
+                    "visualization_format": visualization_format,
+                }
+            except Exception as e:
+                yield {"type": "error", "text_response": f"Error rendering chart: {str(e)}"}
+
+
+_registry: Optional[TitanicAgentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry() -> TitanicAgentRegistry:
+    """
+    Return the process-wide agent registry, creating it on first use.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TitanicAgentRegistry()
+    return _registry
+
+
+def create_titanic_agent(registry: Optional[TitanicAgentRegistry] = None):
+    """
+    Create and return a simple function to handle Titanic dataset queries.
+
+    Args:
+        registry: Registry whose tools the handler should use. Defaults to
+            the process-wide registry.
+    """
+    if registry is None:
+        return get_agent_registry().handler
+
+    # Just return a simple function that can handle queries directly
+    def simple_query_handler(query: str) -> ToolResult:
+        """
+        Handle queries using our tools directly, asking the LLM fallback (if
+        enabled) only about the queries they don't understand.
+        """
+        return registry.answer(query)
     
     return simple_query_handler
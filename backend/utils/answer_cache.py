@@ -0,0 +1,272 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Where answers are cached: "memory" (per process), "sqlite" (a file shared
+# by every worker on the machine) or "off"
+ANSWER_CACHE = os.environ.get("ANSWER_CACHE", "memory").lower()
+
+# Upper bounds on the cached answers; charts make answers large, so the
+# total size in bytes is capped as well as the number of entries
+ANSWER_CACHE_MAX_BYTES = int(os.environ.get("ANSWER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 2048))
+
+# Seconds an answer stays valid; 0 keeps answers until evicted
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", 3600))
+
+# SQLite file used by the "sqlite" backend
+ANSWER_CACHE_PATH = os.environ.get(
+    "ANSWER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "answer_cache.sqlite3")
+)
+
+
+class MemoryAnswerStore:
+    """
+    Thread-safe LRU store bounded by entry count and total size in bytes.
+    """
+
+    def __init__(self, max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the unexpired value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Dict[str, Any], size: int, expires_at: Optional[float]):
+        """Store a value, evicting least recently used entries over the bounds."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (expires_at, size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def retain_prefix(self, prefix: str):
+        """Drop the entries whose key does not start with prefix."""
+        with self._lock:
+            for key in [key for key in self._entries if not key.startswith(prefix)]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+
+class SqliteAnswerStore:
+    """
+    LRU store in a SQLite file, so that every worker process on a machine
+    shares the cached answers. Values are stored as JSON.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL, used_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM answers WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any], size: int, expires_at: Optional[float]):
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        encoded = json.dumps(value)
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO answers (key, value, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, encoded, size, expires_at, now)
+                )
+                connection.execute("DELETE FROM answers WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                total, entries = connection.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM answers").fetchone()
+                for evicted_key, evicted_size in connection.execute(
+                    "SELECT key, size FROM answers ORDER BY used_at"
+                ).fetchall():
+                    if total <= self.max_bytes and entries <= self.max_entries:
+                        break
+                    connection.execute("DELETE FROM answers WHERE key = ?", (evicted_key,))
+                    total -= evicted_size
+                    entries -= 1
+                    self.evictions += 1
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM answers")
+
+    def retain_prefix(self, prefix: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM answers WHERE substr(key, 1, ?) != ?", (len(prefix), prefix))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, entries = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM answers"
+            ).fetchone()
+        return {
+            'backend': 'sqlite',
+            'path': self.path,
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+        }
+
+
+class AnswerCache:
+    """
+    Cache of serialized /ask answers keyed on the normalized question, the
+    visualization format and the dataset fingerprint.
+
+    The fingerprint is a hash of the dataset's contents, so answers are
+    invalidated whenever the data changes and stay valid across worker
+    processes that loaded the same file.
+    """
+
+    def __init__(self, store=None, ttl: float = ANSWER_CACHE_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            store: MemoryAnswerStore or SqliteAnswerStore. A memory store is
+                created if None.
+            ttl: Seconds an answer stays valid, or 0 for no expiry
+        """
+        self.store = store if store is not None else MemoryAnswerStore()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(normalized_query: str, visualization_format: str, dataset_fingerprint: str) -> str:
+        return f"{dataset_fingerprint}:{visualization_format}:{normalized_query}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for key, or None on a miss."""
+        try:
+            value = self.store.get(key)
+        except sqlite3.Error as e:
+            print(f"Answer cache lookup failed: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, answer: Dict[str, Any]):
+        """Cache an answer. It must be JSON-serializable."""
+        size = len(json.dumps(answer))
+        expires_at = time.time() + self.ttl if self.ttl > 0 else None
+        try:
+            self.store.put(key, answer, size, expires_at)
+        except sqlite3.Error as e:
+            print(f"Answer cache store failed: {e}")
+
+    def clear(self):
+        self.store.clear()
+
+    def invalidate(self, dataset_fingerprint: str):
+        """Drop the answers computed from any other dataset."""
+        try:
+            self.store.retain_prefix(f"{dataset_fingerprint}:")
+        except sqlite3.Error as e:
+            print(f"Answer cache invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counters and the store's size."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return dict(
+            self.store.stats(),
+            hits=hits,
+            misses=misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+        )
+
+
+def create_answer_cache(backend: str = ANSWER_CACHE) -> Optional[AnswerCache]:
+    """
+    Create the answer cache for a backend name.
+
+    Args:
+        backend: "memory", "sqlite" or "off"
+
+    Returns:
+        The cache, or None when caching is off
+    """
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return AnswerCache(MemoryAnswerStore())
+    if backend == "sqlite":
+        return AnswerCache(SqliteAnswerStore())
+    raise ValueError(f"Unknown answer cache backend: {backend}")
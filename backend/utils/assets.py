@@ -0,0 +1,54 @@
+import functools
+import os
+from typing import Dict, Tuple
+
+from .compression import compress, supported_encodings
+from .http_cache import make_etag
+
+# Where chart HTML loads plotly.js from: "self" for the versioned bundle this
+# API serves under /static, "cdn", or "auto" for self when PUBLIC_URL is set
+# and the CDN otherwise
+PLOTLYJS_SOURCE = os.environ.get("PLOTLYJS_SOURCE", "auto").lower()
+
+# Public base URL of this API, e.g. https://chat-bot-5pr0.onrender.com.
+# Chart HTML is usually shown on another origin, e.g. in an iframe, so it
+# needs the absolute URL to reach the bundle. With PLOTLYJS_SOURCE=self and
+# no PUBLIC_URL the bundle is referenced by a root-relative path, which only
+# works for pages served by this API.
+PUBLIC_URL = os.environ.get("PUBLIC_URL", "").rstrip("/")
+
+# Versioned asset URLs never change content, so clients may keep them a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@functools.lru_cache(maxsize=None)
+def plotlyjs_version() -> str:
+    """Version of the plotly.js bundled with the installed plotly package."""
+    from plotly.offline import get_plotlyjs_version
+    return get_plotlyjs_version()
+
+
+def plotlyjs_path() -> str:
+    """Path of the versioned plotly.js bundle served by this API."""
+    return f"/static/plotly-{plotlyjs_version()}.min.js"
+
+
+def plotlyjs_source() -> str:
+    """Value for plotly's include_plotlyjs when rendering chart HTML."""
+    if PLOTLYJS_SOURCE == "cdn" or (PLOTLYJS_SOURCE == "auto" and not PUBLIC_URL):
+        return "cdn"
+    return PUBLIC_URL + plotlyjs_path()
+
+
+@functools.lru_cache(maxsize=None)
+def plotlyjs_bundle() -> Tuple[Dict[str, bytes], str]:
+    """
+    Return the plotly.js bundle in every supported content encoding,
+    compressed once, and the ETag of the uncompressed bundle.
+    """
+    from plotly.offline import get_plotlyjs
+    body = get_plotlyjs().encode()
+    bundle = {"identity": body}
+    for encoding in supported_encodings():
+        bundle[encoding] = compress(body, encoding)
+    return bundle, make_etag(body)
@@ -0,0 +1,212 @@
+import importlib.util
+import os
+import zlib
+from typing import List, Optional, Tuple
+
+# brotli is optional; without it responses are only gzip-compressed
+HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+# Compress HTTP responses for clients that accept gzip or brotli
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Complete responses smaller than this many bytes are sent uncompressed;
+# streamed responses are always compressed
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# Compression levels: gzip 1-9, brotli 0-11. Moderate levels compress
+# chart JSON and HTML almost as well as the maximum at a fraction of the CPU.
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+# Media types worth compressing
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if HAS_BROTLI else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str, encodings: Tuple[str, ...] = None) -> Optional[str]:
+    """
+    Pick the content encoding for a response from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Value of the request's Accept-Encoding header
+        encodings: Encodings available, most preferred first. Defaults to
+            supported_encodings().
+
+    Returns:
+        "br", "gzip" or None to send the body as is
+    """
+    if encodings is None:
+        encodings = supported_encodings()
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best = None
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best is not None else None
+
+
+class Compressor:
+    """Incremental gzip or brotli compressor."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            import brotli
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """
+        Compress a chunk. With flush, everything compressed so far is
+        emitted so the client can decode it right away.
+        """
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        """Compress any remaining input and end the stream."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body with gzip or brotli."""
+    compressor = Compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with brotli or gzip,
+    whichever the client prefers among those available.
+
+    Complete bodies below the size threshold are left alone; streamed
+    bodies are compressed chunk by chunk and flushed after each one, so
+    NDJSON events still reach the client as they are produced.
+
+    A compressed response is a different representation from the
+    uncompressed one, so its ETag gets the encoding appended, e.g.
+    "abc-gzip". The suffix is stripped again from incoming If-None-Match
+    headers before the application compares them with its own ETags.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope["headers"]
+        if_none_match = _header(request_headers, b"if-none-match")
+        revalidated_encoding = None
+        if if_none_match is not None:
+            for encoding in supported_encodings():
+                suffix = f'-{encoding}"'.encode()
+                if suffix in if_none_match:
+                    revalidated_encoding = encoding
+                    if_none_match = if_none_match.replace(suffix, b'"')
+            scope = dict(scope, headers=[
+                (key, if_none_match if key.lower() == b"if-none-match" else value)
+                for key, value in request_headers
+            ])
+
+        encoding = choose_encoding((_header(request_headers, b"accept-encoding") or b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                headers = response_start.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                compressible = (
+                    _header(headers, b"content-encoding") is None
+                    and content_type.startswith(COMPRESSIBLE_TYPES)
+                    and response_start["status"] not in (204, 304)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not compressible:
+                    etag = _header(headers, b"etag")
+                    suffix = f'-{revalidated_encoding}"'.encode()
+                    if (response_start["status"] == 304 and revalidated_encoding and etag is not None
+                            and not etag.endswith(suffix)):
+                        # Confirm the compressed representation the client holds,
+                        # unless the application already named it
+                        response_start = dict(response_start, headers=[
+                            (key, etag[:-1] + suffix if key.lower() == b"etag" else value)
+                            for key, value in headers
+                        ])
+                    await send(response_start)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers = [
+                    (key, value) for key, value in headers
+                    if key.lower() not in (b"content-length", b"etag", b"vary")
+                ]
+                headers.append((b"content-encoding", encoding.encode()))
+                vary = _header(response_start.get("headers", []), b"vary")
+                headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                etag = _header(response_start.get("headers", []), b"etag")
+                if etag is not None and etag.endswith(b'"'):
+                    headers.append((b"etag", etag[:-1] + f'-{encoding}"'.encode()))
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send(dict(response_start, headers=headers))
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(dict(response_start, headers=headers))
+
+            if compressor is None:
+                await send(message)
+                return
+            if more_body:
+                chunk = compressor.compress(body, flush=True)
+            else:
+                chunk = compressor.compress(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
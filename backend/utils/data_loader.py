@@ -1,35 +1,369 @@
 import pandas as pd
-from typing import Dict, Any, List
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Tuple, Union
+import contextvars
 import os
+import threading
+import time
+
+from .dtypes import optimize_dtypes
+from .profile import profile_dataframe
+from .query_engine import QuerySpec, execute_query
+from .shared_dataset import load_shared_dataset
+from .storage import DATA_STORAGE, HAS_PYARROW, load_dataset
+
+# Path of the dataset CSV; defaults to data/titanic.csv in the repository
+DATA_PATH = os.environ.get("DATA_PATH")
+
+# Columns that always get an aggregate index entry
+INDEXED_COLUMNS = ['Sex', 'Pclass', 'Embarked', 'Survived']
+
+# Other columns are indexed when they have at most this many distinct values
+MAX_INDEX_CARDINALITY = 20
+
+# Default number of histogram bins (an integer or a numpy bin rule like "auto")
+HISTOGRAM_BINS = os.environ.get("HISTOGRAM_BINS", "30")
+DEFAULT_HISTOGRAM_BINS = int(HISTOGRAM_BINS) if HISTOGRAM_BINS.isdigit() else HISTOGRAM_BINS
+
+# Convert columns to compact dtypes after loading
+OPTIMIZE_DTYPES = os.environ.get("OPTIMIZE_DTYPES", "true").lower() in ("1", "true", "yes")
+
+class DatasetSnapshot:
+    """
+    One load of the dataset together with everything derived from it.
+    
+    Snapshots are treated as immutable: a reload builds a new snapshot and
+    swaps it in, while code still holding the old one keeps a consistent
+    view of the data until it is done.
+    """
+    
+    def __init__(self, df: pd.DataFrame, version: int, fingerprint: str,
+                 storage_used: str, memory_report: Dict[str, Any], source_stat: tuple):
+        """
+        Initialize the snapshot and build its aggregate index.
+        
+        Args:
+            df: The loaded dataframe. It must not be modified afterwards.
+            version: Monotonically increasing version of the dataset
+            fingerprint: SHA-256 of the source file
+            storage_used: Storage format the data was read from
+            memory_report: Dtype optimization report, or None
+            source_stat: (size, mtime_ns) of the source file when loaded
+        """
+        self.df = df
+        self.version = version
+        self.fingerprint = fingerprint
+        self.storage_used = storage_used
+        self.memory_report = memory_report
+        self.source_stat = source_stat
+        self.loaded_at = time.time()
+        self.row_count = len(df)
+        self.aggregate_index = self._build_aggregate_index()
+        self.histograms = {}
+        self._codes = {}
+        self._masks = {}
+        self._numeric = {}
+        self._profile = None
+    
+    @property
+    def profile(self) -> Dict[str, Any]:
+        """Schema and per-column statistics of the data, computed on first use."""
+        if self._profile is None:
+            self._profile = profile_dataframe(self.df)
+        return self._profile
+    
+    def _build_aggregate_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Precompute value counts, totals and missing counts for the
+        categorical columns so percentage and count questions are lookups.
+        """
+        index = {}
+        total = len(self.df)
+        for column in self.df.columns:
+            series = self.df[column]
+            if column not in INDEXED_COLUMNS and series.nunique() > MAX_INDEX_CARDINALITY:
+                continue
+            index[column] = {
+                'counts': series.value_counts().to_dict(),
+                'total': total,
+                'missing': int(series.isnull().sum()),
+            }
+        return index
+    
+    def get_codes(self, column: str) -> Tuple[np.ndarray, List[Any]]:
+        """
+        Factorize a column, caching the result.
+        
+        Returns:
+            Tuple of (read-only array with the position of each row's value
+            in the sorted distinct values, -1 where missing; the distinct
+            values as Python scalars)
+        """
+        codes = self._codes.get(column)
+        if codes is None:
+            positions, uniques = pd.factorize(self.df[column], sort=True)
+            positions = positions.astype(np.intp)
+            positions.flags.writeable = False
+            codes = (positions, [value.item() if hasattr(value, 'item') else value for value in uniques])
+            self._codes[column] = codes
+        return codes
+    
+    def get_mask(self, column: str, value: Any) -> np.ndarray:
+        """Return a cached, read-only boolean mask of the rows where column == value."""
+        key = (column, value)
+        mask = self._masks.get(key)
+        if mask is None:
+            positions, uniques = self.get_codes(column)
+            mask = positions == uniques.index(value) if value in uniques else np.zeros(self.row_count, dtype=bool)
+            mask.flags.writeable = False
+            self._masks[key] = mask
+        return mask
+    
+    def get_numeric(self, column: str) -> np.ndarray:
+        """Return a cached, read-only float64 array of a column, NaN where missing."""
+        values = self._numeric.get(column)
+        if values is None:
+            values = self.df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            values.flags.writeable = False
+            self._numeric[column] = values
+        return values
+
 
 class TitanicDataLoader:
-    def __init__(self, data_path: str = None):
+    def __init__(self, data_path: str = None, storage: str = DATA_STORAGE,
+                 columns: List[str] = None, optimize: bool = OPTIMIZE_DTYPES,
+                 autoload: bool = True):
         """
         Initialize the Titanic data loader.
         
         Args:
             data_path: Path to the Titanic CSV file. If None, uses default path.
+            storage: Storage format to load from: "auto", "csv", "parquet",
+                "arrow" or "shared". Columnar formats use a cached copy of the
+                CSV; "shared" maps one copy shared by every process.
+            columns: Columns to load. If None, loads all columns.
+            optimize: Whether to convert columns to compact dtypes.
+            autoload: Load the data now. If False, it is loaded by an
+                explicit load_data() call or on first use.
         """
+        if data_path is None:
+            data_path = DATA_PATH
         if data_path is None:
             # Default to data/titanic.csv relative to this file's location
             current_dir = os.path.dirname(os.path.abspath(__file__))
             data_path = os.path.join(current_dir, "..", "..", "data", "titanic.csv")
         
         self.data_path = data_path
-        self.df = None
-        self.load_data()
+        self.storage = storage
+        self.columns = columns
+        self.optimize = optimize
+        self._snapshot = None
+        self._last_version = 0
+        self._pinned = contextvars.ContextVar(f"titanic_snapshot_{id(self)}", default=None)
+        self._load_lock = threading.RLock()
+        self._reload_listeners = []
+        self._watch_stop = None
+        self._checked_stat = None
+        if autoload:
+            self.load_data()
+    
+    def load_data(self) -> DatasetSnapshot:
+        """
+        Load the Titanic dataset, from a columnar copy if configured, and
+        atomically swap it in as the current snapshot. If loading fails the
+        current snapshot stays in place.
+        
+        Returns:
+            The new snapshot
+        """
+        with self._load_lock:
+            try:
+                stat = os.stat(self.data_path)
+                df, fingerprint, storage_used, memory_report = self._read()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Titanic dataset not found at {self.data_path}")
+            missing = [column for column in INDEXED_COLUMNS if column not in df.columns]
+            if self.columns is None and missing:
+                raise ValueError(f"Titanic dataset at {self.data_path} is missing columns: {missing}")
+            snapshot = DatasetSnapshot(
+                df, self._last_version + 1, fingerprint, storage_used, memory_report,
+                (stat.st_size, stat.st_mtime_ns)
+            )
+            self._last_version = snapshot.version
+            self._snapshot = snapshot
+        print(f"Loaded {len(df)} rows of Titanic data ({storage_used}, version {snapshot.version})")
+        
+        for listener in list(self._reload_listeners):
+            listener(snapshot)
+        return snapshot
+    
+    def _read(self) -> Tuple[pd.DataFrame, str, str, Dict[str, Any]]:
+        """
+        Read the dataset with the configured storage.
+        
+        Returns:
+            Tuple of (dataframe, SHA-256 of the source CSV, storage name
+            used, dtype optimization report or None)
+        """
+        if self.storage == "shared":
+            if HAS_PYARROW:
+                # The shared copy is optimized once by whichever process publishes it
+                df, fingerprint, memory_report = load_shared_dataset(self.data_path, self.columns, self.optimize)
+                return df, fingerprint, "shared", memory_report
+            print("Shared dataset storage needs pyarrow; loading a private copy")
+        df, fingerprint, storage_used = load_dataset(
+            self.data_path, "auto" if self.storage == "shared" else self.storage, self.columns
+        )
+        memory_report = None
+        if self.optimize:
+            df, memory_report = optimize_dtypes(df)
+        return df, fingerprint, storage_used, memory_report
     
-    def load_data(self):
-        """Load the Titanic dataset from CSV file."""
+    def ensure_loaded(self):
+        """Load the data if it has not been loaded yet."""
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.load_data()
+    
+    @property
+    def snapshot(self) -> DatasetSnapshot:
+        """
+        The snapshot in effect: the one pinned in the current context, if
+        any, otherwise the latest one. Loads the data on first use.
+        """
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned
+        self.ensure_loaded()
+        return self._snapshot
+    
+    @contextmanager
+    def pinned(self, snapshot: DatasetSnapshot = None):
+        """
+        Make calls on this loader within the block use a single snapshot, so
+        a request sees consistent data even if a reload happens meanwhile.
+        
+        Args:
+            snapshot: Snapshot to use. Defaults to the one currently in effect.
+        """
+        token = self._pinned.set(snapshot if snapshot is not None else self.snapshot)
         try:
-            self.df = pd.read_csv(self.data_path)
-            print(f"Loaded {len(self.df)} rows of Titanic data")
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Titanic dataset not found at {self.data_path}")
+            yield
+        finally:
+            self._pinned.reset(token)
+    
+    def _current(self) -> DatasetSnapshot:
+        """The snapshot in effect, or None if nothing is loaded yet."""
+        return self._pinned.get() or self._snapshot
+    
+    @property
+    def df(self) -> pd.DataFrame:
+        snapshot = self._current()
+        return snapshot.df if snapshot is not None else None
+    
+    @property
+    def version(self) -> int:
+        snapshot = self._current()
+        return snapshot.version if snapshot is not None else 0
+    
+    @property
+    def fingerprint(self) -> str:
+        snapshot = self._current()
+        return snapshot.fingerprint if snapshot is not None else None
+    
+    @property
+    def aggregate_index(self) -> Dict[str, Dict[str, Any]]:
+        snapshot = self._current()
+        return snapshot.aggregate_index if snapshot is not None else {}
+    
+    @property
+    def memory_report(self) -> Dict[str, Any]:
+        snapshot = self._current()
+        return snapshot.memory_report if snapshot is not None else None
+    
+    @property
+    def storage_used(self) -> str:
+        snapshot = self._current()
+        return snapshot.storage_used if snapshot is not None else None
+    
+    def add_reload_listener(self, listener: Callable[[DatasetSnapshot], None]):
+        """
+        Register a callable invoked with each newly loaded snapshot, e.g. to
+        invalidate caches built from an older version.
+        """
+        self._reload_listeners.append(listener)
+    
+    def remove_reload_listener(self, listener: Callable[[DatasetSnapshot], None]):
+        """Unregister a callable added with add_reload_listener."""
+        if listener in self._reload_listeners:
+            self._reload_listeners.remove(listener)
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the dataset if the source file's size or mtime changed since
+        the current snapshot was loaded.
+        
+        Returns:
+            True if a new snapshot was loaded
+        """
+        stat = os.stat(self.data_path)
+        source_stat = (stat.st_size, stat.st_mtime_ns)
+        # A file that failed to load is not retried until it changes again
+        if source_stat == self._checked_stat:
+            return False
+        self._checked_stat = source_stat
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.source_stat == source_stat:
+            return False
+        self.load_data()
+        return True
+    
+    def start_watching(self, interval: float):
+        """
+        Poll the source file in a background thread and reload it when it
+        changes. Failed reloads keep the current snapshot.
+        
+        Args:
+            interval: Seconds between checks
+        """
+        if self._watch_stop is not None:
+            return
+        stop = threading.Event()
+        self._watch_stop = stop
+        
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"Dataset reload failed, keeping version {self.version}: {e}")
+        
+        threading.Thread(target=watch, name="titanic-dataset-watcher", daemon=True).start()
+    
+    def stop_watching(self):
+        """Stop the background file watcher, if running."""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
     
     def get_dataframe(self):
         """Return the loaded dataframe."""
-        return self.df
+        return self.snapshot.df
+    
+    def get_aggregates(self, column: str) -> Dict[str, Any]:
+        """
+        Get the precomputed aggregates for a column.
+        
+        Args:
+            column: Name of the column
+            
+        Returns:
+            Dictionary with 'counts', 'total' and 'missing', or None if the
+            column is not indexed
+        """
+        return self.snapshot.aggregate_index.get(column)
     
     def get_column_stats(self, column: str) -> Dict[str, Any]:
         """
@@ -41,10 +375,18 @@ class TitanicDataLoader:
         Returns:
             Dictionary containing various statistics
         """
-        if self.df is None:
-            raise ValueError("Data not loaded")
+        snapshot = self.snapshot
+        aggregates = snapshot.aggregate_index.get(column)
+        series = snapshot.df[column]
+        if aggregates is not None and not pd.api.types.is_numeric_dtype(series):
+            counts = aggregates['counts']
+            return {
+                'count': aggregates['total'],
+                'unique_values': len(counts),
+                'missing_values': aggregates['missing'],
+                'top_values': dict(list(counts.items())[:10]),
+            }
         
-        series = self.df[column]
         stats = {
             'count': len(series),
             'unique_values': series.nunique(),
@@ -78,11 +420,15 @@ class TitanicDataLoader:
         Returns:
             Percentage as a float
         """
-        if self.df is None:
-            raise ValueError("Data not loaded")
-        
-        count = len(self.df[self.df[column] == value])
-        total = len(self.df)
+        snapshot = self.snapshot
+        df = snapshot.df
+        aggregates = snapshot.aggregate_index.get(column)
+        if aggregates is not None:
+            count = aggregates['counts'].get(value, 0)
+            total = aggregates['total']
+        else:
+            count = len(df[df[column] == value])
+            total = len(df)
         return (count / total) * 100 if total > 0 else 0
     
     def get_value_counts(self, column: str) -> Dict[Any, int]:
@@ -95,10 +441,11 @@ class TitanicDataLoader:
         Returns:
             Dictionary mapping values to their counts
         """
-        if self.df is None:
-            raise ValueError("Data not loaded")
-        
-        return self.df[column].value_counts().to_dict()
+        snapshot = self.snapshot
+        aggregates = snapshot.aggregate_index.get(column)
+        if aggregates is not None:
+            return dict(aggregates['counts'])
+        return snapshot.df[column].value_counts().to_dict()
     
     def get_average(self, column: str) -> float:
         """
@@ -110,25 +457,75 @@ class TitanicDataLoader:
         Returns:
             Average value as a float
         """
-        if self.df is None:
-            raise ValueError("Data not loaded")
+        return self.snapshot.df[column].mean()
+    
+    def query(self, spec: QuerySpec) -> List[Dict[str, Any]]:
+        """
+        Run a filter/group-by/aggregate query, see execute_query.
+        
+        Args:
+            spec: The query
+            
+        Returns:
+            One dictionary per group with its values and aggregates
+        """
+        return execute_query(self.snapshot, spec)
+    
+    def get_histogram(self, column: str, bins: Union[int, str] = None) -> Dict[str, np.ndarray]:
+        """
+        Bin a numeric column with np.histogram, ignoring missing values.
         
-        return self.df[column].mean()
+        Results are cached per column and bin setting on the snapshot, and
+        the returned arrays are read-only.
+        
+        Args:
+            column: Name of the numeric column
+            bins: Number of bins or a numpy bin rule such as "auto".
+                Defaults to DEFAULT_HISTOGRAM_BINS.
+            
+        Returns:
+            Dictionary with 'counts' (one per bin) and 'edges' (one more
+            than the number of bins)
+        """
+        snapshot = self.snapshot
+        if bins is None:
+            bins = DEFAULT_HISTOGRAM_BINS
+        key = (column, bins)
+        histogram = snapshot.histograms.get(key)
+        if histogram is None:
+            values = snapshot.df[column].dropna().to_numpy(dtype=float)
+            counts, edges = np.histogram(values, bins=bins)
+            counts.flags.writeable = False
+            edges.flags.writeable = False
+            histogram = {'counts': counts, 'edges': edges}
+            snapshot.histograms[key] = histogram
+        return histogram
     
-    def get_age_distribution(self) -> Dict[str, Any]:
-        """Get age distribution data."""
-        if self.df is None:
-            raise ValueError("Data not loaded")
+    def get_age_distribution(self, bins: Union[int, str] = None) -> Dict[str, Any]:
+        """
+        Get age distribution data.
         
-        age_data = self.df['Age'].dropna()
+        Args:
+            bins: Number of histogram bins or a numpy bin rule
+            
+        Returns:
+            Summary statistics plus binned 'histogram' counts and edges
+        """
+        with self.pinned():
+            age_data = self.snapshot.df['Age'].dropna()
+            histogram = self.get_histogram('Age', bins)
         return {
             'count': len(age_data),
             'mean': age_data.mean(),
             'median': age_data.median(),
             'min': age_data.min(),
             'max': age_data.max(),
-            'histogram_data': age_data.values.tolist()
+            'histogram': {
+                'counts': histogram['counts'].tolist(),
+                'edges': histogram['edges'].tolist(),
+            }
         }
 
-# Create a global instance for easy access
-titanic_data = TitanicDataLoader()
\ No newline at end of file
+# Create a global instance for easy access. The data itself is loaded by the
+# app's startup hook, or on first use.
+titanic_data = TitanicDataLoader(autoload=False)
\ No newline at end of file
@@ -0,0 +1,142 @@
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Target dtype kind for the known Titanic columns. Columns not listed here
+# get a kind inferred from their contents.
+DTYPE_SCHEMA = {
+    'PassengerId': 'int',
+    'Survived': 'int',
+    'Pclass': 'int',
+    'SibSp': 'int',
+    'Parch': 'int',
+    'Age': 'float32',
+    'Fare': 'float32',
+    'Sex': 'category',
+    'Embarked': 'category',
+    'Ticket': 'category',
+    'Cabin': 'category',
+}
+
+# Inferred string columns become categoricals when at most this fraction of
+# their values is distinct
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Largest relative error accepted when narrowing floats to float32
+FLOAT32_TOLERANCE = 1e-6
+
+
+def _infer_kind(series: pd.Series) -> str:
+    """Pick a dtype kind for a column that is not in the schema."""
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return 'int'
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if len(values) and (values == values.round()).all():
+            return 'int'
+        return 'float32'
+    values = series.dropna()
+    if len(values) and set(values.unique()) <= {True, False}:
+        return 'bool'
+    if series.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+        return 'category'
+    return 'keep'
+
+
+def _to_int(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+    values = series.dropna()
+    if len(values) and not (values == values.round()).all():
+        return series
+    if series.isnull().any():
+        # Nullable integers keep missing values without falling back to float
+        for dtype in ('Int8', 'Int16', 'Int32', 'Int64'):
+            info = np.iinfo(dtype.lower())
+            if values.empty or (values.min() >= info.min and values.max() <= info.max):
+                return series.astype(dtype)
+        return series
+    return pd.to_numeric(series, downcast='integer')
+
+
+def _to_float32(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_float_dtype(series):
+        return series
+    values = series.dropna().to_numpy(dtype=np.float64)
+    narrowed = values.astype(np.float32).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.abs(narrowed - values) / np.maximum(np.abs(values), 1e-12)
+    if len(values) and not (np.isfinite(narrowed).all() and error.max() <= FLOAT32_TOLERANCE):
+        return series
+    return series.astype(np.float32)
+
+
+def _to_bool(series: pd.Series) -> pd.Series:
+    values = series.dropna()
+    if not set(values.unique()) <= {True, False}:
+        return series
+    return series.astype('boolean' if series.isnull().any() else bool)
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    converted = series.astype('category')
+    # Very high-cardinality columns can be larger as categoricals
+    if converted.memory_usage(index=False, deep=True) >= series.memory_usage(index=False, deep=True):
+        return series
+    return converted
+
+
+CONVERTERS = {
+    'int': _to_int,
+    'float32': _to_float32,
+    'bool': _to_bool,
+    'category': _to_category,
+}
+
+
+def optimize_dtypes(df: pd.DataFrame, schema: Dict[str, str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Convert columns to compact dtypes.
+
+    Low-cardinality strings become categoricals, integers are downcast
+    (nullable when they have missing values), and floats become float32
+    when that does not change them beyond FLOAT32_TOLERANCE. A conversion
+    is skipped whenever the column's values do not fit the target kind.
+
+    Args:
+        df: Dataframe to optimize. It is not modified.
+        schema: Mapping of column name to 'int', 'float32', 'bool',
+            'category' or 'keep'. Defaults to DTYPE_SCHEMA.
+
+    Returns:
+        Tuple of (optimized dataframe, memory report). The report has a
+        'columns' entry per column with dtypes and deep memory usage in
+        bytes before and after, plus the totals.
+    """
+    if schema is None:
+        schema = DTYPE_SCHEMA
+
+    optimized = {}
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        kind = schema.get(column) or _infer_kind(series)
+        converter = CONVERTERS.get(kind)
+        result = converter(series) if converter is not None else series
+        optimized[column] = result
+        columns[column] = {
+            'dtype_before': str(series.dtype),
+            'dtype_after': str(result.dtype),
+            'bytes_before': int(series.memory_usage(index=False, deep=True)),
+            'bytes_after': int(result.memory_usage(index=False, deep=True)),
+        }
+
+    report = {
+        'columns': columns,
+        'total_bytes_before': sum(c['bytes_before'] for c in columns.values()),
+        'total_bytes_after': sum(c['bytes_after'] for c in columns.values()),
+    }
+    return pd.DataFrame(optimized, index=df.index), report
@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+# Where query handlers run: "thread", "process" or "inline" (on the event loop)
+QUERY_EXECUTOR = os.environ.get("QUERY_EXECUTOR", "thread").lower()
+
+# Maximum number of queries processed at the same time
+QUERY_WORKERS = int(os.environ.get("QUERY_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+
+# Seconds a query may wait and run before the request gives up on it
+QUERY_TIMEOUT = float(os.environ.get("QUERY_TIMEOUT", 30))
+
+
+def _worker_handler() -> Callable[[str], Any]:
+    """
+    Return the query handler of the current process's registry, first
+    reloading the worker's dataset if the file changed since it was loaded.
+    """
+    try:
+        from backend.models.titanic_agent import get_agent_registry
+        from backend.utils.data_loader import titanic_data
+    except ImportError:
+        # Fallback for local development
+        from ..models.titanic_agent import get_agent_registry
+        from ..utils.data_loader import titanic_data
+    titanic_data.reload_if_changed()
+    return get_agent_registry().handler
+
+
+def _run_query_in_worker(query: str) -> str:
+    """
+    Answer a query inside a worker process using that process's own registry.
+    """
+    return _worker_handler()(query)
+
+
+def _answer_all(handler: Callable[[str], Any], queries: List[str]) -> List[Any]:
+    """
+    Answer each query in turn, returning the exception in place of the
+    answer for any query that fails.
+    """
+    results = []
+    for query in queries:
+        try:
+            results.append(handler(query))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _run_queries_in_worker(queries: List[str]) -> List[Any]:
+    """
+    Answer a batch of queries inside a worker process.
+    """
+    return _answer_all(_worker_handler(), queries)
+
+
+class QueryExecutor:
+    """
+    Runs CPU-bound query handling off the asyncio event loop.
+
+    Blocking callables run on a bounded thread pool. In "process" mode whole
+    queries are sent to a process pool instead, which sidesteps the GIL at
+    the cost of each worker holding its own copy of the dataset.
+    """
+
+    def __init__(self, kind: str = QUERY_EXECUTOR, max_workers: int = QUERY_WORKERS,
+                 timeout: Optional[float] = QUERY_TIMEOUT):
+        """
+        Initialize the executor. Pools are created lazily on first use.
+
+        Args:
+            kind: "thread", "process" or "inline"
+            max_workers: Size of the worker pool
+            timeout: Default per-request timeout in seconds, or None
+        """
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown query executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._thread_pool: Optional[Executor] = None
+        self._process_pool: Optional[Executor] = None
+
+    @property
+    def thread_pool(self) -> Executor:
+        """The bounded thread pool, created on first use."""
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="titanic-query"
+            )
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> Executor:
+        """The process pool, created on first use."""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._process_pool
+
+    def deadline(self) -> Optional[float]:
+        """
+        Return the time.monotonic() by which a request starting now must be
+        answered, or None without a timeout. Passing remaining(deadline) as
+        the timeout of each step makes them share one time budget.
+        """
+        return time.monotonic() + self.timeout if self.timeout is not None else None
+
+    @staticmethod
+    def remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left until a deadline, or None if there is none."""
+        return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+    async def _submit(self, pool: Executor, func: Callable[..., Any], *args,
+                      timeout: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(pool, functools.partial(func, *args))
+        return await asyncio.wait_for(future, timeout if timeout is not None else self.timeout)
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """
+        Run a blocking callable without blocking the event loop.
+
+        Args:
+            func: Callable to run
+            *args: Positional arguments for func
+            timeout: Seconds to wait before raising asyncio.TimeoutError.
+                Defaults to the executor's timeout.
+
+        Returns:
+            The callable's return value
+        """
+        if self.kind == "inline":
+            return func(*args)
+        return await self._submit(self.thread_pool, func, *args, timeout=timeout)
+
+    async def run_query(self, handler: Callable[[str], Any], query: str,
+                        timeout: Optional[float] = None) -> Any:
+        """
+        Answer a query with the configured execution strategy.
+
+        A timed-out query stops being awaited but its worker finishes the
+        computation in the background; the pool size still bounds how many
+        such queries can run at once.
+
+        Args:
+            handler: Query handler used in thread and inline mode
+            query: The user's question
+            timeout: Seconds to wait before raising asyncio.TimeoutError
+
+        Returns:
+            The handler's answer
+        """
+        if self.kind == "process":
+            return await self._submit(self.process_pool, _run_query_in_worker, query, timeout=timeout)
+        return await self.run(handler, query, timeout=timeout)
+
+    async def run_queries(self, handler: Callable[[str], Any], queries: List[str],
+                          timeout: Optional[float] = None) -> List[Any]:
+        """
+        Answer several queries as a single unit of work, so a batch costs
+        one hop to the pool rather than one per query.
+
+        Args:
+            handler: Query handler used in thread and inline mode
+            queries: The questions to answer
+            timeout: Seconds to wait for the whole batch
+
+        Returns:
+            One entry per query, in order: the answer, or the exception the
+            handler raised for it
+        """
+        if self.kind == "process":
+            return await self._submit(self.process_pool, _run_queries_in_worker, queries, timeout=timeout)
+        return await self.run(_answer_all, handler, queries, timeout=timeout)
+
+    def shutdown(self):
+        """Shut down any pools that were started."""
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
+
+
+# Create a global instance for easy access
+query_executor = QueryExecutor()
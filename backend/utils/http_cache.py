@@ -0,0 +1,31 @@
+import hashlib
+
+
+def make_etag(body: bytes) -> str:
+    """Return a strong ETag derived from the hash of a response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    W/ prefix added by a proxy does not prevent a match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def cache_control(max_age: int) -> str:
+    """
+    Return a Cache-Control value letting clients reuse a response for
+    max_age seconds, or revalidate it on every use when max_age is 0.
+    """
+    if max_age <= 0:
+        return "no-cache"
+    return f"public, max-age={max_age}"
@@ -0,0 +1,262 @@
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Collect metrics and serve them at /metrics. When off, timers and counters
+# are no-ops.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Histogram bucket upper bounds for durations in seconds and sizes in bytes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labelnames: Sequence[str], labels: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.enabled = True
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.enabled = True
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "stage", "start")
+
+    def __init__(self, histogram: Histogram, stage: str):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text
+    exposition format.
+
+    Gauges whose values live elsewhere (cache sizes, dataset version) are
+    read at scrape time from registered collectors, so keeping them costs
+    nothing between scrapes.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        metric.enabled = self.enabled
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        metric.enabled = self.enabled
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        """
+        Register a callable returning (name, type, help, value) tuples to
+        include in every scrape.
+        """
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        """Unregister a callable added with add_collector."""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, metric_type, documentation, value in samples:
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}",
+                          f"{name} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+# Create a global instance for easy access
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "titanic_stage_seconds",
+    "Time spent in each stage of answering a question.",
+    ["stage"]
+)
+QUERIES_TOTAL = metrics.counter(
+    "titanic_queries_total",
+    "Questions answered, by tool and outcome.",
+    ["tool", "outcome"]
+)
+HTTP_REQUESTS_TOTAL = metrics.counter(
+    "titanic_http_requests_total",
+    "HTTP requests, by method, route and status code.",
+    ["method", "path", "status"]
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "titanic_http_request_seconds",
+    "HTTP request duration, including streaming the body.",
+    ["method", "path"]
+)
+HTTP_RESPONSE_BYTES = metrics.histogram(
+    "titanic_http_response_bytes",
+    "HTTP response body size.",
+    ["method", "path"],
+    buckets=SIZE_BUCKETS
+)
+
+
+def stage_timer(stage: str):
+    """
+    Return a context manager recording the duration of a pipeline stage,
+    e.g. "routing", "tool", "figure", "to_html" or "response".
+    """
+    if not metrics.enabled:
+        return _NULL_TIMER
+    return _StageTimer(STAGE_SECONDS, stage)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests and recording their duration
+    and response body size, labelled by route template rather than raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+        size = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                size[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Without path parameters the matched path is the route's full
+            # template; unmatched paths share one label to bound cardinality
+            route = scope.get("route")
+            if route is None:
+                path = "unmatched"
+            elif "{" in getattr(route, "path", ""):
+                path = route.path
+            else:
+                path = scope["path"]
+            method = scope["method"]
+            HTTP_REQUESTS_TOTAL.inc(method, path, str(status[0]))
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, path)
+            HTTP_RESPONSE_BYTES.observe(size[0], method, path)
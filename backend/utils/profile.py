@@ -0,0 +1,54 @@
+import math
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+
+def _column_kind(series: pd.Series) -> str:
+    """Classify a column as 'boolean', 'numeric', 'categorical' or 'other'."""
+    if pd.api.types.is_bool_dtype(series):
+        return 'boolean'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series):
+        return 'categorical'
+    return 'other'
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Convert a numeric scalar to a JSON-safe float (None for missing)."""
+    if value is pd.NA or value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Describe a dataframe's schema and contents.
+
+    Args:
+        df: Dataframe to profile
+
+    Returns:
+        Dictionary with the row count and, per column in order, its dtype,
+        kind, null count and number of distinct values. Numeric columns
+        also get their min, max and mean. Every value is JSON-serializable.
+    """
+    columns = []
+    for column in df.columns:
+        series = df[column]
+        kind = _column_kind(series)
+        entry = {
+            'name': column,
+            'dtype': str(series.dtype),
+            'kind': kind,
+            'nulls': int(series.isnull().sum()),
+            'cardinality': int(series.nunique()),
+        }
+        if kind == 'numeric':
+            entry['min'] = _to_float(series.min())
+            entry['max'] = _to_float(series.max())
+            entry['mean'] = _to_float(series.mean())
+        columns.append(entry)
+    return {'rows': len(df), 'columns': columns}
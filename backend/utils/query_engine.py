@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .data_loader import DatasetSnapshot
+
+# Aggregates understood by execute_query. "count" and "pct" take no column;
+# "mean" and "median" take a numeric column.
+AGGREGATES = ("count", "pct", "mean", "median")
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    A parsed question over the dataset.
+
+    Attributes:
+        filters: (column, value) equality predicates the rows must all match,
+            in addition to `within`
+        group_by: Columns to group the matching rows by
+        aggregates: (name, column) pairs to compute per group. "pct" is the
+            share of rows matching the filters among the rows matching
+            `within`, in percent.
+        within: (column, value) predicates defining the population "pct" is
+            relative to. Empty means every row of the group.
+    """
+    filters: Tuple[Tuple[str, Any], ...] = ()
+    group_by: Tuple[str, ...] = ()
+    aggregates: Tuple[Tuple[str, Optional[str]], ...] = (("count", None),)
+    within: Tuple[Tuple[str, Any], ...] = ()
+
+
+def aggregate_key(name: str, column: Optional[str]) -> str:
+    """Return the result key of an aggregate, e.g. "count" or "mean_Age"."""
+    return name if column is None else f"{name}_{column}"
+
+
+def _combined_mask(snapshot: 'DatasetSnapshot', predicates) -> np.ndarray:
+    mask = None
+    for column, value in predicates:
+        column_mask = snapshot.get_mask(column, value)
+        mask = column_mask if mask is None else mask & column_mask
+    if mask is None:
+        return np.ones(snapshot.row_count, dtype=bool)
+    return mask
+
+
+def _group_codes(snapshot: 'DatasetSnapshot', group_by) -> Tuple[np.ndarray, List[tuple]]:
+    """
+    Return one group number per row (-1 where a group column is missing)
+    and the group values for each group number.
+    """
+    if not group_by:
+        return np.zeros(snapshot.row_count, dtype=np.intp), [()]
+    codes = []
+    uniques = []
+    for column in group_by:
+        column_codes, column_uniques = snapshot.get_codes(column)
+        codes.append(column_codes)
+        uniques.append(column_uniques)
+    shape = tuple(len(values) for values in uniques)
+    valid = np.logical_and.reduce([column_codes >= 0 for column_codes in codes])
+    groups = np.full(snapshot.row_count, -1, dtype=np.intp)
+    groups[valid] = np.ravel_multi_index([column_codes[valid] for column_codes in codes], shape)
+    keys = [
+        tuple(uniques[i][position] for i, position in enumerate(index))
+        for index in np.ndindex(*shape)
+    ]
+    return groups, keys
+
+
+def execute_query(snapshot: 'DatasetSnapshot', spec: QuerySpec) -> List[Dict[str, Any]]:
+    """
+    Run a query spec against a dataset snapshot.
+
+    Filters are combined from the snapshot's cached per-value masks, and
+    every aggregate is computed for all groups at once with np.bincount, so
+    the cost does not grow with the number of groups or filters.
+
+    Args:
+        snapshot: Dataset snapshot to query
+        spec: The query
+
+    Returns:
+        One dictionary per non-empty group, with the group column values
+        and one entry per aggregate (see aggregate_key). Without group_by
+        there is a single row.
+    """
+    for name, column in spec.aggregates:
+        if name not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {name}")
+    groups, keys = _group_codes(snapshot, spec.group_by)
+    n_groups = len(keys)
+    valid = groups >= 0
+    population = _combined_mask(snapshot, spec.within) & valid
+    matching = _combined_mask(snapshot, spec.filters) & population
+    counts = np.bincount(groups[matching], minlength=n_groups)
+    population_counts = np.bincount(groups[population], minlength=n_groups)
+
+    results = {}
+    for name, column in spec.aggregates:
+        key = aggregate_key(name, column)
+        if name == "count":
+            results[key] = counts
+        elif name == "pct":
+            with np.errstate(divide='ignore', invalid='ignore'):
+                results[key] = np.where(population_counts > 0, counts / population_counts * 100, 0.0)
+        else:
+            values = snapshot.get_numeric(column)
+            present = matching & ~np.isnan(values)
+            if name == "mean":
+                sums = np.bincount(groups[present], weights=values[present], minlength=n_groups)
+                value_counts = np.bincount(groups[present], minlength=n_groups)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    results[key] = sums / value_counts
+            else:
+                # Sorting by group once lets each median use a contiguous slice
+                order = np.argsort(groups[present], kind='stable')
+                sorted_groups = groups[present][order]
+                sorted_values = values[present][order]
+                bounds = np.searchsorted(sorted_groups, np.arange(n_groups + 1))
+                results[key] = np.array([
+                    np.median(sorted_values[start:end]) if end > start else np.nan
+                    for start, end in zip(bounds[:-1], bounds[1:])
+                ])
+
+    # pct rows are kept when their population is non-empty, other rows
+    # when they have matching rows
+    keep = population_counts > 0 if any(name == "pct" for name, _ in spec.aggregates) else counts > 0
+    if not spec.group_by:
+        keep = np.ones(1, dtype=bool)
+    rows = []
+    for group in np.flatnonzero(keep):
+        row = dict(zip(spec.group_by, keys[group]))
+        for key, values in results.items():
+            row[key] = values[group].item()
+        rows.append(row)
+    return rows
@@ -0,0 +1,156 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dtypes import optimize_dtypes
+from .storage import file_sha256, load_dataset
+
+# Directory holding the shared dataset segments. /dev/shm is RAM-backed on
+# Linux, so every process mapping a segment there shares the same pages.
+SHARED_DATASET_DIR = os.environ.get(
+    "SHARED_DATASET_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+
+
+def _segment_prefix(csv_path: str, directory: str) -> str:
+    """Return the file name prefix of the segments of one source file."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    source = hashlib.sha256(os.path.abspath(csv_path).encode()).hexdigest()[:8]
+    return os.path.join(directory, f"{stem}-{source}-")
+
+
+def segment_path(csv_path: str, sha256: str, optimize: bool = True,
+                 directory: str = SHARED_DATASET_DIR) -> str:
+    """
+    Return the path of the shared segment for one version of a source file.
+
+    Segments are named after the source path and the hash of its contents,
+    so processes that loaded the same file agree on the segment without
+    coordinating.
+    """
+    return f"{_segment_prefix(csv_path, directory)}{sha256[:16]}{'' if optimize else '-raw'}.arrow"
+
+
+def _to_table(df: pd.DataFrame):
+    """
+    Convert a dataframe to an Arrow table that maps back into pandas
+    without copying.
+
+    Float columns keep NaN as a value instead of becoming nulls, which
+    pandas would otherwise have to fill back in with a copy.
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, column in enumerate(df.columns):
+        dtype = df[column].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+            table = table.set_column(i, table.field(i), pa.array(df[column].to_numpy(), from_pandas=False))
+    return table
+
+
+def publish_shared_dataset(csv_path: str, optimize: bool = True,
+                           directory: str = SHARED_DATASET_DIR) -> str:
+    """
+    Load a CSV file, optimize its dtypes and write it to a shared segment
+    as an Arrow IPC file, unless a segment for its contents already exists.
+    Segments of older versions of the same file are removed; processes
+    that still map them keep their pages until they let go.
+
+    Args:
+        csv_path: Path to the source CSV file
+        optimize: Whether to convert columns to compact dtypes first
+        directory: Directory to write the segment to
+
+    Returns:
+        Path of the segment
+    """
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    df, sha256, _ = load_dataset(csv_path, "auto")
+    path = segment_path(csv_path, sha256, optimize, directory)
+    if not os.path.exists(path):
+        memory_report = None
+        if optimize:
+            df, memory_report = optimize_dtypes(df)
+        table = _to_table(df)
+        # Write to temporary files first so readers never see a partial segment
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        with open(f"{tmp_path}.meta.json", "w") as f:
+            json.dump({"sha256": sha256, "memory_report": memory_report}, f)
+        os.replace(f"{tmp_path}.meta.json", f"{path}.meta.json")
+        os.replace(tmp_path, path)
+
+    for stale in glob.glob(f"{glob.escape(_segment_prefix(csv_path, directory))}*.arrow"):
+        if stale != path and stale.endswith("-raw.arrow") == path.endswith("-raw.arrow"):
+            _remove_segment(stale)
+    return path
+
+
+def attach_shared_dataset(path: str) -> Tuple[pd.DataFrame, str, Optional[Dict[str, Any]]]:
+    """
+    Memory-map a shared segment and wrap it in a dataframe without copying.
+
+    Returns:
+        Tuple of (read-only dataframe, SHA-256 of the source CSV, dtype
+        optimization report or None)
+    """
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    with open(f"{path}.meta.json") as f:
+        meta = json.load(f)
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps one block per column so pandas does not consolidate
+    # (and copy) columns of the same dtype
+    return table.to_pandas(split_blocks=True), meta["sha256"], meta["memory_report"]
+
+
+def load_shared_dataset(csv_path: str, columns: Optional[List[str]] = None, optimize: bool = True,
+                        directory: str = SHARED_DATASET_DIR) -> Tuple[pd.DataFrame, str, Optional[Dict[str, Any]]]:
+    """
+    Attach the shared segment for the current contents of a CSV file,
+    publishing it first if no other process has.
+
+    Args:
+        csv_path: Path to the source CSV file
+        columns: Columns to keep, or None for all of them
+        optimize: Whether the segment holds compact dtypes
+        directory: Directory holding the segments
+
+    Returns:
+        Tuple of (dataframe, SHA-256 of the source CSV, dtype optimization
+        report or None)
+    """
+    path = segment_path(csv_path, file_sha256(csv_path), optimize, directory)
+    try:
+        df, sha256, memory_report = attach_shared_dataset(path)
+    except FileNotFoundError:
+        df, sha256, memory_report = attach_shared_dataset(publish_shared_dataset(csv_path, optimize, directory))
+    if columns is not None:
+        df = df[columns]
+    return df, sha256, memory_report
+
+
+def _remove_segment(path: str):
+    for file_path in (path, f"{path}.meta.json"):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_shared_datasets(csv_path: str, directory: str = SHARED_DATASET_DIR):
+    """Remove every shared segment of a source file, e.g. on shutdown."""
+    for path in glob.glob(f"{glob.escape(_segment_prefix(csv_path, directory))}*.arrow"):
+        _remove_segment(path)
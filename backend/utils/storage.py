@@ -0,0 +1,177 @@
+import hashlib
+import importlib.util
+import json
+import os
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# pyarrow is optional; without it the dataset is always read from CSV.
+# It is imported only when a columnar file is actually read or written.
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Storage format for the dataset: "auto", "csv", "parquet", "arrow" or
+# "shared". "auto" uses a memory-mapped Arrow IPC copy when pyarrow is
+# installed; "shared" maps one copy in shared memory for all worker processes
+# (see shared_dataset.py).
+DATA_STORAGE = os.environ.get("DATA_STORAGE", "auto").lower()
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CsvStorage:
+    """Reads the dataset directly from CSV."""
+
+    name = "csv"
+    suffix = ".csv"
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return pd.read_csv(path, usecols=columns)
+
+
+class ParquetStorage:
+    """Reads and writes Parquet files, memory-mapping them on read."""
+
+    name = "parquet"
+    suffix = ".parquet"
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    def write(self, df: pd.DataFrame, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+class ArrowIpcStorage:
+    """Reads and writes Arrow IPC files, memory-mapping them on read."""
+
+    name = "arrow"
+    suffix = ".arrow"
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.ipc
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    def write(self, df: pd.DataFrame, path: str):
+        import pyarrow as pa
+        import pyarrow.ipc
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+
+STORAGES = {
+    "csv": CsvStorage,
+    "parquet": ParquetStorage,
+    "arrow": ArrowIpcStorage,
+}
+
+
+def get_storage(name: str = DATA_STORAGE):
+    """
+    Return the storage backend for a format name.
+
+    Args:
+        name: "auto", "csv", "parquet" or "arrow"
+
+    Returns:
+        A storage instance. Columnar formats fall back to CSV when pyarrow
+        is not installed.
+    """
+    if name == "auto":
+        name = "arrow"
+    if name not in STORAGES:
+        raise ValueError(f"Unknown data storage: {name}")
+    if name != "csv" and not HAS_PYARROW:
+        return CsvStorage()
+    return STORAGES[name]()
+
+
+def ensure_columnar_copy(csv_path: str, storage) -> Tuple[str, str]:
+    """
+    Write a columnar copy of a CSV file next to it, unless an up-to-date
+    copy already exists.
+
+    A sidecar "<copy>.meta.json" records the source's size, mtime and hash.
+    The copy is reused when size and mtime match, or when the hash still
+    matches after a touch.
+
+    Args:
+        csv_path: Path to the source CSV file
+        storage: Columnar storage used to write the copy
+
+    Returns:
+        Tuple of (path of the columnar copy, SHA-256 of the source CSV)
+    """
+    copy_path = os.path.splitext(csv_path)[0] + storage.suffix
+    meta_path = copy_path + ".meta.json"
+    stat = os.stat(csv_path)
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    meta = None
+    if os.path.exists(copy_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+    if meta is not None and meta.get("size") == source["size"] and meta.get("mtime_ns") == source["mtime_ns"]:
+        return copy_path, meta["sha256"]
+
+    sha256 = file_sha256(csv_path)
+    if meta is None or meta.get("sha256") != sha256:
+        # Write to a temporary file first so readers never see a partial copy
+        tmp_path = f"{copy_path}.{os.getpid()}.tmp"
+        storage.write(pd.read_csv(csv_path), tmp_path)
+        os.replace(tmp_path, copy_path)
+
+    tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta_path, "w") as f:
+        json.dump(dict(source, sha256=sha256), f)
+    os.replace(tmp_meta_path, meta_path)
+    return copy_path, sha256
+
+
+def load_dataset(csv_path: str, storage_name: str = DATA_STORAGE,
+                 columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, str, str]:
+    """
+    Load the dataset using the configured storage backend.
+
+    Columnar formats read from a cached copy next to the CSV. If that copy
+    cannot be written or read, the CSV is read instead.
+
+    Args:
+        csv_path: Path to the source CSV file
+        storage_name: "auto", "csv", "parquet" or "arrow"
+        columns: Columns to load, or None for all of them
+
+    Returns:
+        Tuple of (dataframe, SHA-256 of the source CSV, storage name used)
+    """
+    storage = get_storage(storage_name)
+    if not isinstance(storage, CsvStorage):
+        try:
+            copy_path, sha256 = ensure_columnar_copy(csv_path, storage)
+            return storage.read(copy_path, columns), sha256, storage.name
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"Could not use {storage.name} storage ({e}); falling back to CSV")
+    return CsvStorage().read(csv_path, columns), file_sha256(csv_path), CsvStorage.name
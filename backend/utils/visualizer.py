@@ -1,46 +1,273 @@
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
-from typing import Dict, Any, List
+import numpy as np
+import json
+from typing import TYPE_CHECKING, Dict, Any, Callable, List
 import base64
 from io import BytesIO
+from collections import OrderedDict
+import functools
+import inspect
 import os
+import threading
 
 # Import here to avoid circular imports
+from .assets import plotlyjs_source
 from .data_loader import titanic_data
+from .metrics import stage_timer
+
+# plotly is imported inside the chart builders so that importing this module
+# stays cheap; charts are first built by the startup hook or a request
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+# Maximum number of charts kept in memory
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", 64))
+
+
+class ChartCache:
+    """
+    Bounded, thread-safe LRU cache for rendered chart output.
+    """
+
+    def __init__(self, max_entries: int = CHART_CACHE_SIZE):
+        """
+        Initialize the chart cache.
+        
+        Args:
+            max_entries: Maximum number of charts to keep
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Any], bool]):
+        """Drop the entries whose key matches predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the current size and hit/miss counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class Chart:
+    """
+    A chart whose figure and HTML are produced on first use and then reused.
+    
+    Pickling renders the figure, so charts can cross process boundaries.
+    """
+
+    def __init__(self, build: Callable[[], 'go.Figure']):
+        """
+        Initialize the chart.
+        
+        Args:
+            build: Callable that creates the plotly figure
+        """
+        self._build = build
+        self._figure = None
+        self._html = None
+        self._spec = None
+        self._lock = threading.Lock()
+
+    @property
+    def figure(self) -> 'go.Figure':
+        """The plotly figure, built on first access."""
+        if self._figure is None:
+            with self._lock:
+                if self._figure is None:
+                    with stage_timer("figure"):
+                        self._figure = self._build()
+        return self._figure
+
+    def to_html(self) -> str:
+        """
+        Return the chart as an HTML string. plotly.js is loaded from the
+        bundle this API serves (see assets.py), so browsers fetch it once.
+        """
+        if self._html is None:
+            figure = self.figure
+            with stage_timer("to_html"):
+                self._html = figure.to_html(include_plotlyjs=plotlyjs_source())
+        return self._html
+
+    def to_spec(self) -> Dict[str, Any]:
+        """
+        Return the chart as a compact, JSON-ready plotly figure spec.
+        
+        The layout template is left out; clients apply their own theme.
+        """
+        if self._spec is None:
+            figure = self.figure
+            with stage_timer("to_spec"):
+                spec = json.loads(figure.to_json())
+            spec.get('layout', {}).pop('template', None)
+            self._spec = spec
+        return self._spec
+
+    def render(self, visualization_format: str = 'html'):
+        """
+        Serialize the chart.
+        
+        Args:
+            visualization_format: 'html' for an HTML page, 'json' for a
+                plotly figure spec
+        """
+        if visualization_format == 'json':
+            return self.to_spec()
+        return self.to_html()
+
+    def __getstate__(self):
+        return {'figure': self.figure, 'html': self._html, 'spec': self._spec}
+
+    def __setstate__(self, state):
+        self._build = None
+        self._figure = state['figure']
+        self._html = state['html']
+        self._spec = state['spec']
+        self._lock = threading.Lock()
+
+
+def cached_chart(method):
+    """
+    Turn a figure-building method into one returning a cached Chart, keyed
+    by method name, arguments and the dataset version. The figure is built
+    from the snapshot in effect when the chart was requested.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs) -> Chart:
+        # Normalize the arguments so positional, keyword and default
+        # spellings of the same call share an entry
+        snapshot = self.data_loader.snapshot
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (
+            method.__name__,
+            tuple(bound.arguments.items())[1:],
+            snapshot.version,
+        )
+        chart = self.cache.get(key)
+        if chart is None:
+            def build():
+                with self.data_loader.pinned(snapshot):
+                    return method(self, *args, **kwargs)
+            chart = Chart(build)
+            self.cache.put(key, chart)
+        return chart
+    return wrapper
+
 
 class TitanicVisualizer:
-    def __init__(self, data_loader):
+    def __init__(self, data_loader, cache: ChartCache = None):
         """
         Initialize the Titanic visualizer.
         
         Args:
             data_loader: Instance of TitanicDataLoader
+            cache: Cache for charts. A new one is created if None.
         """
         self.data_loader = data_loader
-        self.df = data_loader.get_dataframe()
+        self.cache = cache if cache is not None else ChartCache()
+        data_loader.add_reload_listener(self._on_reload)
+    
+    def _on_reload(self, snapshot):
+        """Drop charts built from an older dataset version."""
+        self.cache.discard(lambda key: key[-1] < snapshot.version)
+    
+    @property
+    def df(self):
+        """The dataframe of the snapshot currently in effect."""
+        return self.data_loader.get_dataframe()
+    
+    def prewarm(self):
+        """
+        Render the default charts so the first requests are served from cache.
+        """
+        self.create_age_distribution_histogram()
+        self.create_survival_by_category('Sex')
+        self.create_survival_by_category('Pclass')
+    
+    def _binned_histogram(self, column: str, bins, title: str, color: str) -> 'go.Figure':
+        """
+        Draw a histogram from the data loader's binned counts rather than
+        letting plotly bin the rows, so the figure carries one bar per bin.
+        """
+        import plotly.graph_objects as go
+        
+        histogram = self.data_loader.get_histogram(column, bins)
+        counts, edges = histogram['counts'], histogram['edges']
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            marker_color=color
+        ))
+        fig.update_layout(title=title, bargap=0)
+        return fig
     
-    def create_histogram(self, column: str, title: str = None) -> str:
+    @cached_chart
+    def build_histogram(self, column: str, title: str = None, bins=None) -> Chart:
         """
         Create a histogram for a specified column.
         
         Args:
             column: Name of the column to visualize
             title: Title for the chart
+            bins: Number of bins or a numpy bin rule for numeric columns
             
         Returns:
-            HTML string of the plotly figure
+            Chart wrapping the plotly figure
         """
+        import plotly.express as px
+        
         if title is None:
             title = f"Distribution of {column}"
         
-        fig = px.histogram(
-            self.df,
-            x=column,
-            title=title,
-            labels={column: column.replace('_', ' ').title()},
-            color_discrete_sequence=['#1f77b4']
-        )
+        if pd.api.types.is_numeric_dtype(self.df[column]):
+            fig = self._binned_histogram(column, bins, title, '#1f77b4')
+        else:
+            value_counts = self.df[column].value_counts()
+            fig = px.bar(
+                x=value_counts.index,
+                y=value_counts.values,
+                title=title,
+                color_discrete_sequence=['#1f77b4']
+            )
         
         fig.update_layout(
             xaxis_title=column.replace('_', ' ').title(),
@@ -49,9 +276,10 @@ class TitanicVisualizer:
             height=500
         )
         
-        return fig.to_html(include_plotlyjs='cdn')
+        return fig
     
-    def create_bar_chart(self, column: str, title: str = None) -> str:
+    @cached_chart
+    def build_bar_chart(self, column: str, title: str = None) -> Chart:
         """
         Create a bar chart for a specified column.
         
@@ -60,8 +288,10 @@ class TitanicVisualizer:
             title: Title for the chart
             
         Returns:
-            HTML string of the plotly figure
+            Chart wrapping the plotly figure
         """
+        import plotly.express as px
+        
         if title is None:
             title = f"Bar Chart of {column}"
         
@@ -81,9 +311,10 @@ class TitanicVisualizer:
             height=500
         )
         
-        return fig.to_html(include_plotlyjs='cdn')
+        return fig
     
-    def create_pie_chart(self, column: str, title: str = None) -> str:
+    @cached_chart
+    def build_pie_chart(self, column: str, title: str = None) -> Chart:
         """
         Create a pie chart for a specified column.
         
@@ -92,8 +323,10 @@ class TitanicVisualizer:
             title: Title for the chart
             
         Returns:
-            HTML string of the plotly figure
+            Chart wrapping the plotly figure
         """
+        import plotly.express as px
+        
         if title is None:
             title = f"Pie Chart of {column}"
         
@@ -110,26 +343,20 @@ class TitanicVisualizer:
             height=500
         )
         
-        return fig.to_html(include_plotlyjs='cdn')
+        return fig
     
-    def create_age_distribution_histogram(self) -> str:
+    @cached_chart
+    def build_age_distribution_histogram(self, bins=None) -> Chart:
         """
         Create a histogram specifically for age distribution.
         
+        Args:
+            bins: Number of bins or a numpy bin rule
+        
         Returns:
-            HTML string of the plotly figure
-        """
-        # Drop NaN values for age
-        age_data = self.df.dropna(subset=['Age'])
-        
-        fig = px.histogram(
-            age_data,
-            x='Age',
-            nbins=30,
-            title='Distribution of Passenger Ages',
-            labels={'Age': 'Age'},
-            color_discrete_sequence=['#2ca02c']
-        )
+            Chart wrapping the plotly figure
+        """
+        fig = self._binned_histogram('Age', bins, 'Distribution of Passenger Ages', '#2ca02c')
         
         fig.update_layout(
             xaxis_title='Age',
@@ -138,9 +365,10 @@ class TitanicVisualizer:
             height=500
         )
         
-        return fig.to_html(include_plotlyjs='cdn')
+        return fig
     
-    def create_survival_by_category(self, category: str) -> str:
+    @cached_chart
+    def build_survival_by_category(self, category: str) -> Chart:
         """
         Create a bar chart showing survival rates by category.
         
@@ -148,8 +376,10 @@ class TitanicVisualizer:
             category: Column name to group by (e.g., 'Sex', 'Pclass')
             
         Returns:
-            HTML string of the plotly figure
+            Chart wrapping the plotly figure
         """
+        import plotly.express as px
+        
         # Create a crosstab of survival by category
         crosstab = pd.crosstab(self.df[category], self.df['Survived'], normalize='index') * 100
         
@@ -175,8 +405,27 @@ class TitanicVisualizer:
             height=500
         )
         
-        return fig.to_html(include_plotlyjs='cdn')
+        return fig
+
+    def create_histogram(self, column: str, title: str = None, bins=None) -> str:
+        """Return a histogram of a column as an HTML string."""
+        return self.build_histogram(column, title, bins).to_html()
+    
+    def create_bar_chart(self, column: str, title: str = None) -> str:
+        """Return a bar chart of a column as an HTML string."""
+        return self.build_bar_chart(column, title).to_html()
+    
+    def create_pie_chart(self, column: str, title: str = None) -> str:
+        """Return a pie chart of a column as an HTML string."""
+        return self.build_pie_chart(column, title).to_html()
+    
+    def create_age_distribution_histogram(self, bins=None) -> str:
+        """Return the age distribution histogram as an HTML string."""
+        return self.build_age_distribution_histogram(bins).to_html()
+    
+    def create_survival_by_category(self, category: str) -> str:
+        """Return survival rates by category as an HTML string."""
+        return self.build_survival_by_category(category).to_html()
 
-# Create a global instance for easy access
 # Create a global instance for easy access
 titanic_visualizer = TitanicVisualizer(titanic_data)
\ No newline at end of file
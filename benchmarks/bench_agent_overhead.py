@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the per-request overhead of the /ask query handler.
+
+Compares the old behaviour (build a handler and five fresh tools for every
+query) against the shared tools held by the agent registry.
+
+Usage:
+    python benchmarks/bench_agent_overhead.py [--iterations N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.models.titanic_agent import TitanicAgentRegistry, get_agent_registry
+
+QUERY = "What percentage of passengers were male on the Titanic?"
+
+
+def per_request_agent(query: str) -> str:
+    """Reproduce the previous per-request behaviour with a fresh registry."""
+    return TitanicAgentRegistry().handler(query)
+
+
+def shared_agent(query: str) -> str:
+    """Use the process-wide registry, as the API now does."""
+    return get_agent_registry().handler(query)
+
+
+def time_it(func, iterations: int) -> float:
+    """Return the mean time per call in microseconds."""
+    func(QUERY)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(QUERY)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    before = time_it(per_request_agent, args.iterations)
+    after = time_it(shared_agent, args.iterations)
+
+    print(f"Query: {QUERY!r} ({args.iterations} iterations)")
+    print(f"  per-request agent: {before:10.1f} us/query")
+    print(f"  shared registry:   {after:10.1f} us/query")
+    print(f"  overhead removed:  {before - after:10.1f} us/query ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
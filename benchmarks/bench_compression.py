@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Measure bytes sent for each TitanicVisualizer chart with and without compression.
+
+Each chart is wrapped in an /ask answer exactly as the API encodes it, in
+both visualization formats, and compressed with every encoding the
+response layer supports at its configured level. Also reports the time
+spent compressing, which is paid once per response.
+
+Usage:
+    python benchmarks/bench_compression.py [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_micro import chart_cases
+from benchmarks.common import DEFAULT_TOLERANCE, compare_to_baseline, make_report, time_call, write_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    os.environ["METRICS_ENABLED"] = "false"
+    from backend.api.routes import build_answer, encode_answer
+    from backend.models.titanic_agent import ToolResult
+    from backend.utils.compression import COMPRESSION_MIN_SIZE, compress, supported_encodings
+    from backend.utils.data_loader import TitanicDataLoader
+    from backend.utils.visualizer import ChartCache, TitanicVisualizer
+
+    visualizer = TitanicVisualizer(TitanicDataLoader(), ChartCache(max_entries=0))
+    encodings = supported_encodings()
+
+    header = f"{'chart':<34} {'format':<6} {'identity':>9}"
+    for encoding in encodings:
+        header += f" {encoding:>8} {'ratio':>6} {'ms':>6}"
+    print(header)
+
+    metrics = {}
+    for name, factory in chart_cases(visualizer):
+        chart = factory()
+        for visualization_format in ("html", "json"):
+            answer = build_answer("benchmark", ToolResult("", chart), visualization_format)
+            body, _ = encode_answer(answer)
+            prefix = f"{name}.{visualization_format}"
+            metrics[f"{prefix}.identity_bytes"] = len(body)
+            line = f"{name:<34} {visualization_format:<6} {len(body):>9}"
+            for encoding in encodings:
+                size = len(compress(body, encoding))
+                elapsed = statistics.median(time_call(lambda: compress(body, encoding), 0.05)) * 1000
+                metrics[f"{prefix}.{encoding}_bytes"] = size
+                metrics[f"{prefix}.{encoding}_ms"] = elapsed
+                line += f" {size:>8} {len(body) / size:>5.1f}x {elapsed:>6.2f}"
+            print(line)
+    print(f"\nComplete bodies under {COMPRESSION_MIN_SIZE} bytes (COMPRESSION_MIN_SIZE) are sent uncompressed.")
+
+    report = make_report("compression", metrics, encodings=list(encodings))
+    if args.output:
+        write_report(report, args.output)
+    if args.baseline and compare_to_baseline(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
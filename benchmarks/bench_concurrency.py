@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for /api/v1/ask with a mix of text and chart queries.
+
+Requests are sent in-process through an ASGI transport, so a handler that
+blocks the event loop shows up directly as health-check latency. The chart
+and answer caches are disabled so every query is answered and every chart
+query renders a figure.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--executor thread|process|inline]
+                                           [--concurrency N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+QUERIES = [
+    "What percentage of passengers were male on the Titanic?",
+    "Show me a histogram of passenger ages",
+    "What was the average ticket fare?",
+    "How many passengers embarked from each port?",
+]
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(label, samples):
+    """Print p50/p99 latency in milliseconds."""
+    print(f"  {label:<8} n={len(samples):<5} p50={percentile(samples, 50) * 1000:8.2f} ms"
+          f"  p99={percentile(samples, 99) * 1000:8.2f} ms"
+          f"  mean={statistics.mean(samples) * 1000:8.2f} ms")
+
+
+async def run(args):
+    import httpx
+    from backend.main import app
+    from backend.utils.executor import QueryExecutor
+
+    latencies = {"text": [], "chart": [], "health": []}
+    done = asyncio.Event()
+
+    async with app.router.lifespan_context(app):
+        # The lifespan hook installs the default executor; use the one under test
+        app.state.query_executor = QueryExecutor(kind=args.executor, max_workers=args.workers)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            queue = asyncio.Queue()
+            for i in range(args.requests):
+                queue.put_nowait(QUERIES[i % len(QUERIES)])
+
+            async def worker():
+                while not queue.empty():
+                    query = queue.get_nowait()
+                    start = time.perf_counter()
+                    response = await client.post("/api/v1/ask", json={"query": query})
+                    elapsed = time.perf_counter() - start
+                    kind = "chart" if response.json()["visualization"] else "text"
+                    latencies[kind].append(elapsed)
+
+            async def health_probe():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await client.get("/api/v1/health")
+                    latencies["health"].append(time.perf_counter() - start)
+                    await asyncio.sleep(0.005)
+
+            probe = asyncio.create_task(health_probe())
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - start
+            done.set()
+            await probe
+        app.state.query_executor.shutdown()
+
+    print(f"executor={args.executor} concurrency={args.concurrency} requests={args.requests}")
+    print(f"  throughput: {args.requests / wall:.1f} req/s")
+    for label, samples in latencies.items():
+        if samples:
+            summarize(label, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--executor", default="thread", choices=["thread", "process", "inline"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    os.environ["CHART_CACHE_SIZE"] = "0"
+    os.environ["ANSWER_CACHE"] = "off"
+    os.environ["PREWARM_CHARTS"] = "false"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Report the memory saved by compact dtypes and check that answers do not change.
+
+Each sample question is answered in two fresh processes, one with
+OPTIMIZE_DTYPES=false and one with the optimization on, and the text answers
+and loader statistics are compared. Exits with status 1 on any difference.
+
+Usage:
+    python benchmarks/bench_dtypes.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+QUESTIONS = [
+    "What percentage of passengers were male on the Titanic?",
+    "What percentage of passengers survived?",
+    "What percentage of passengers were in third class?",
+    "What percentage of passengers embarked from Cherbourg?",
+    "How many passengers embarked from each port?",
+    "How many passengers survived?",
+    "How many first class passengers were there?",
+    "What was the average ticket fare?",
+    "What was the average age?",
+    "Show me a histogram of passenger ages",
+    "Tell me about passenger class",
+    "Tell me about gender",
+    "Tell me about the port",
+    "Tell me about who survived",
+]
+
+
+def collect_answers():
+    """Answer every question and gather loader statistics in this process."""
+    from backend.models.titanic_agent import create_titanic_agent
+    from backend.utils.data_loader import titanic_data
+
+    agent = create_titanic_agent()
+    answers = {question: agent(question).text for question in QUESTIONS}
+    df = titanic_data.get_dataframe()
+    stats = {
+        "percentages": {
+            f"{column}={value}": round(titanic_data.calculate_percentage(column, value), 6)
+            for column in ("Sex", "Pclass", "Embarked", "Survived")
+            for value in df[column].dropna().unique().tolist()
+        },
+        "averages": {column: round(float(titanic_data.get_average(column)), 4) for column in ("Age", "Fare")},
+        "age_histogram": titanic_data.get_histogram("Age")["counts"].tolist(),
+    }
+    return {"answers": answers, "stats": stats, "memory": titanic_data.memory_report}
+
+
+def run_child(optimize: bool):
+    """Collect answers in a fresh process with dtype optimization on or off."""
+    env = dict(os.environ, OPTIMIZE_DTYPES="true" if optimize else "false")
+    output = subprocess.run(
+        [sys.executable, __file__, "--child"], env=env, check=True,
+        capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if "--child" in sys.argv:
+        print(json.dumps(collect_answers()))
+        return
+
+    baseline = run_child(optimize=False)
+    optimized = run_child(optimize=True)
+
+    memory = optimized["memory"]
+    print(f"{'column':<12} {'before':>10} {'after':>10}  dtype")
+    for column, info in memory["columns"].items():
+        print(f"{column:<12} {info['bytes_before']:>10} {info['bytes_after']:>10}"
+              f"  {info['dtype_before']} -> {info['dtype_after']}")
+    print(f"{'total':<12} {memory['total_bytes_before']:>10} {memory['total_bytes_after']:>10}")
+
+    mismatches = [
+        question for question in QUESTIONS
+        if baseline["answers"][question] != optimized["answers"][question]
+    ]
+    for question in mismatches:
+        print(f"MISMATCH {question!r}: {baseline['answers'][question]!r} != {optimized['answers'][question]!r}")
+    if baseline["stats"] != optimized["stats"]:
+        mismatches.append("stats")
+        print("MISMATCH in loader statistics")
+
+    if mismatches:
+        sys.exit(1)
+    print(f"All {len(QUESTIONS)} answers and loader statistics unchanged")
+
+
+if __name__ == "__main__":
+    main()
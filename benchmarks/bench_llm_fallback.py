@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Latency of the LLM fallback against the stand-in server, cold and cached.
+
+Questions no keyword tool understands are sent through the agent registry
+from several threads at once, first with an empty completion cache and
+then again, so the second round is answered from the cache. The stub
+server (benchmarks/llm_stub_server.py) runs in this process with a fixed
+completion latency and records the most completions it served at once,
+which must not exceed --max-concurrency.
+
+Usage:
+    python benchmarks/bench_llm_fallback.py [--questions N] [--threads N]
+                                            [--max-concurrency N] [--latency S]
+                                            [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.common import DEFAULT_TOLERANCE, compare_to_baseline, make_report, percentile, write_report
+from benchmarks.llm_stub_server import create_app
+
+
+def start_stub(latency):
+    """Serve the stub on a free local port and return (server, app, base URL)."""
+    import uvicorn
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    app = create_app(latency)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, app, f"http://127.0.0.1:{port}/v1"
+
+
+def ask_all(registry, questions, threads):
+    """Answer the questions concurrently; return each one's latency in seconds."""
+    def ask(question):
+        start = time.perf_counter()
+        result = registry.answer(question)
+        if not (result.data or {}).get("source") == "llm":
+            raise RuntimeError(f"Not answered by the LLM: {question!r}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(ask, questions))
+
+
+def run(args, cache_path):
+    from backend.models.llm_fallback import LLMFallback
+    from backend.models.titanic_agent import TitanicAgentRegistry
+    from backend.utils.answer_cache import AnswerCache, SqliteAnswerStore
+    from backend.utils.data_loader import titanic_data
+
+    titanic_data.load_data()
+    server, app, base_url = start_stub(args.latency)
+    try:
+        registry = TitanicAgentRegistry()
+        registry.llm_fallback = LLMFallback(
+            base_url=base_url, api_key="stub", model="stub",
+            max_concurrency=args.max_concurrency, queue_timeout=60,
+            cache=AnswerCache(SqliteAnswerStore(cache_path), ttl=0),
+        )
+        questions = [f"Who was on the passenger list as entry {i}?" for i in range(args.questions)]
+        cold = ask_all(registry, questions, args.threads)
+        cached = ask_all(registry, questions, args.threads)
+        stats = registry.llm_fallback.stats()
+    finally:
+        server.should_exit = True
+
+    metrics = {
+        "cold_p50_ms": percentile(cold, 50) * 1000,
+        "cold_max_ms": max(cold) * 1000,
+        "cached_p50_ms": percentile(cached, 50) * 1000,
+        "cached_max_ms": max(cached) * 1000,
+        "peak_in_flight": app.state.peak_in_flight,
+    }
+    print(f"questions={args.questions} threads={args.threads} "
+          f"max_concurrency={args.max_concurrency} latency={args.latency}s")
+    print(f"  cold:     p50 {metrics['cold_p50_ms']:.1f} ms  max {metrics['cold_max_ms']:.1f} ms")
+    print(f"  cached:   p50 {metrics['cached_p50_ms']:.2f} ms  max {metrics['cached_max_ms']:.2f} ms")
+    print(f"  stub:     {app.state.requests} completions, at most {app.state.peak_in_flight} at once")
+    print(f"  tokens:   {stats['prompt_tokens']} prompt, {stats['completion_tokens']} completion")
+    return make_report(
+        "llm_fallback",
+        metrics,
+        completions=app.state.requests,
+        requests=stats["requests"],
+        tokens={"prompt": stats["prompt_tokens"], "completion": stats["completion_tokens"]},
+        config={
+            "questions": args.questions,
+            "threads": args.threads,
+            "max_concurrency": args.max_concurrency,
+            "latency": args.latency,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per stub completion")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run(args, os.path.join(directory, "llm_cache.sqlite3"))
+
+    if args.output:
+        write_report(report, args.output)
+    failed = (
+        report["completions"] != args.questions
+        or report["metrics"]["peak_in_flight"] > args.max_concurrency
+    )
+    regressions = args.baseline and compare_to_baseline(report, args.baseline, args.tolerance)
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+In-process load generator for /api/v1/ask with a weighted mix of questions.
+
+Requests go through an ASGI transport to the real application, with its
+lifespan hook, so the numbers cover routing, the executor, the caches and
+serialization without any network in the way. Questions are drawn from a
+weighted mix (benchmarks/data/load_mix.json by default) with a fixed seed,
+so runs send the same sequence and can be compared against a baseline.
+
+Usage:
+    python benchmarks/bench_load.py [--concurrency N] [--requests N | --duration S]
+                                    [--format html|json] [--no-cache]
+                                    [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.common import (
+    DEFAULT_TOLERANCE, compare_to_baseline, make_report, peak_rss_mb, percentile, write_report
+)
+
+DEFAULT_MIX = os.path.join(project_root, "benchmarks", "data", "load_mix.json")
+
+
+def load_mix(path):
+    """Return the questions and their weights from a mix file."""
+    with open(path) as f:
+        mix = json.load(f)
+    return [entry["query"] for entry in mix], [entry.get("weight", 1) for entry in mix]
+
+
+async def run(args):
+    import httpx
+    from backend.main import app
+
+    questions, weights = load_mix(args.mix)
+    rng = random.Random(args.seed)
+    latencies = []
+    statuses = Counter()
+    sent = [0]
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def ask(query):
+                return await client.post(
+                    "/api/v1/ask", json={"query": query, "visualization_format": args.format}
+                )
+
+            # Warm up every question once so first-call costs are excluded
+            for query in questions:
+                await ask(query)
+
+            deadline = time.perf_counter() + args.duration if args.duration else None
+
+            def next_query():
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return None
+                elif sent[0] >= args.requests:
+                    return None
+                sent[0] += 1
+                return rng.choices(questions, weights)[0]
+
+            async def worker():
+                while (query := next_query()) is not None:
+                    start = time.perf_counter()
+                    try:
+                        response = await ask(query)
+                        statuses[response.status_code] += 1
+                        if response.status_code == 200 and not response.json().get("success"):
+                            statuses["unanswered"] += 1
+                    except httpx.HTTPError:
+                        statuses["transport_error"] += 1
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    metrics = {
+        "throughput_per_s": len(latencies) / wall,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"concurrency={args.concurrency} requests={len(latencies)} format={args.format} "
+          f"cache={'off' if args.no_cache else 'on'}")
+    print(f"  throughput: {metrics['throughput_per_s']:.1f} req/s")
+    print(f"  latency:    p50 {metrics['latency_p50_ms']:.2f} ms  p95 {metrics['latency_p95_ms']:.2f} ms"
+          f"  p99 {metrics['latency_p99_ms']:.2f} ms  max {metrics['latency_max_ms']:.2f} ms")
+    print(f"  peak RSS:   {metrics['peak_rss_mb']:.1f} MiB")
+    print(f"  errors:     {errors} {dict(statuses) if errors else ''}")
+    return make_report(
+        "load",
+        metrics,
+        requests=len(latencies),
+        errors=errors,
+        config={
+            "concurrency": args.concurrency,
+            "format": args.format,
+            "cache": not args.no_cache,
+            "mix": os.path.relpath(args.mix, project_root),
+            "seed": args.seed,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Run for this many seconds instead of a fixed number of requests")
+    parser.add_argument("--format", default="html", choices=["html", "json"])
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="JSON list of {query, weight}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the answer and chart caches so every request does the work")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so set them before loading the app
+    os.environ["PREWARM_CHARTS"] = "false"
+    if args.no_cache:
+        os.environ["ANSWER_CACHE"] = "off"
+        os.environ["CHART_CACHE_SIZE"] = "0"
+    report = asyncio.run(run(args))
+
+    if args.output:
+        write_report(report, args.output)
+    regressions = args.baseline and compare_to_baseline(report, args.baseline, args.tolerance)
+    if report["errors"] or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
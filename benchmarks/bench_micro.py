@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for every TitanicDataLoader method and TitanicVisualizer chart.
+
+Loader methods are timed against a loaded snapshot, with per-snapshot
+caches (histograms, masks) cleared before each call where a method has one,
+so the numbers reflect the computation rather than a dictionary lookup.
+Each chart is timed in three stages: building the figure, serializing it
+to HTML and to a JSON spec. The chart cache is bypassed.
+
+Usage:
+    python benchmarks/bench_micro.py [--rows N] [--min-time S]
+                                     [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.common import (
+    DEFAULT_TOLERANCE, compare_to_baseline, make_report, peak_rss_mb, percentile, time_call, write_report
+)
+
+CSV_PATH = os.path.join(project_root, "data", "titanic.csv")
+
+
+def loader_cases(loader):
+    """Return (name, callable, setup) for each loader method."""
+    from backend.utils.query_engine import QuerySpec
+
+    def clear_snapshot_caches():
+        snapshot = loader.snapshot
+        snapshot.histograms.clear()
+        snapshot._codes.clear()
+        snapshot._masks.clear()
+        snapshot._numeric.clear()
+
+    grouped = QuerySpec(
+        filters=(("Sex", "female"),),
+        group_by=("Pclass", "Survived"),
+        aggregates=(("count", None), ("pct", None), ("mean", "Age"), ("median", "Fare")),
+    )
+    return [
+        ("load_data", loader.load_data, None),
+        ("get_dataframe", loader.get_dataframe, None),
+        ("get_aggregates", lambda: loader.get_aggregates("Sex"), None),
+        ("get_column_stats.categorical", lambda: loader.get_column_stats("Sex"), None),
+        ("get_column_stats.numeric", lambda: loader.get_column_stats("Age"), None),
+        ("calculate_percentage.indexed", lambda: loader.calculate_percentage("Sex", "male"), None),
+        ("calculate_percentage.scan", lambda: loader.calculate_percentage("Age", 22), None),
+        ("get_value_counts", lambda: loader.get_value_counts("Embarked"), None),
+        ("get_average", lambda: loader.get_average("Fare"), None),
+        ("get_histogram.cold", lambda: loader.get_histogram("Age"), clear_snapshot_caches),
+        ("get_histogram.warm", lambda: loader.get_histogram("Age"), None),
+        ("get_age_distribution", loader.get_age_distribution, clear_snapshot_caches),
+        ("query.cold", lambda: loader.query(grouped), clear_snapshot_caches),
+        ("query.warm", lambda: loader.query(grouped), None),
+    ]
+
+
+def chart_cases(visualizer):
+    """Return (name, chart factory) for each visualizer chart."""
+    return [
+        ("build_histogram.numeric", lambda: visualizer.build_histogram("Fare")),
+        ("build_histogram.categorical", lambda: visualizer.build_histogram("Embarked")),
+        ("build_bar_chart", lambda: visualizer.build_bar_chart("Pclass")),
+        ("build_pie_chart", lambda: visualizer.build_pie_chart("Sex")),
+        ("build_age_distribution_histogram", visualizer.build_age_distribution_histogram),
+        ("build_survival_by_category", lambda: visualizer.build_survival_by_category("Pclass")),
+    ]
+
+
+def run(args, csv_path):
+    from backend.utils.data_loader import TitanicDataLoader
+    from backend.utils.visualizer import ChartCache, TitanicVisualizer
+
+    loader = TitanicDataLoader(csv_path)
+    visualizer = TitanicVisualizer(loader, ChartCache(max_entries=0))
+    print(f"{loader.snapshot.row_count} rows, storage={loader.storage_used}")
+
+    metrics = {}
+
+    def record(name, samples):
+        median = statistics.median(samples) * 1000
+        p95 = percentile(samples, 95) * 1000
+        metrics[f"{name}.median_ms"] = median
+        metrics[f"{name}.p95_ms"] = p95
+        print(f"  {name:<50} median {median:9.3f} ms  p95 {p95:9.3f} ms  n={len(samples)}")
+
+    print("TitanicDataLoader")
+    for name, func, setup in loader_cases(loader):
+        record(f"loader.{name}", time_call(func, args.min_time, setup=setup))
+
+    print("TitanicVisualizer")
+    for name, factory in chart_cases(visualizer):
+        record(f"chart.{name}.figure", time_call(lambda: factory().figure, args.min_time))
+        charts = []
+        record(f"chart.{name}.to_html", time_call(
+            lambda: charts[-1].to_html(), args.min_time,
+            setup=lambda: charts.append(_built(factory))
+        ))
+        record(f"chart.{name}.to_spec", time_call(
+            lambda: charts[-1].to_spec(), args.min_time,
+            setup=lambda: charts.append(_built(factory))
+        ))
+        charts.clear()
+
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(f"peak RSS: {metrics['peak_rss_mb']:.1f} MiB")
+    return make_report("micro", metrics, rows=loader.snapshot.row_count)
+
+
+def _built(factory):
+    """Return a new chart with its figure already built."""
+    chart = factory()
+    chart.figure
+    return chart
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=0,
+                        help="Replicate the dataset to about this many rows (default: bundled file)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to measure each case for")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    os.environ["METRICS_ENABLED"] = "false"
+    tmp = tempfile.mkdtemp()
+    try:
+        csv_path = CSV_PATH
+        if args.rows:
+            import pandas as pd
+            df = pd.read_csv(CSV_PATH)
+            csv_path = os.path.join(tmp, "titanic.csv")
+            pd.concat([df] * max(1, args.rows // len(df)), ignore_index=True).to_csv(csv_path, index=False)
+        else:
+            # Keep columnar copies of the bundled file out of data/
+            csv_path = shutil.copy(CSV_PATH, tmp)
+        report = run(args, csv_path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        write_report(report, args.output)
+    if args.baseline and compare_to_baseline(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark routing accuracy and throughput of the intent router.
+
+Every question in the labelled corpus is routed by the compiled router and
+by the substring cascade it replaced, and the intent, column and value each
+picks are compared with the expected ones. Throughput is measured without
+the per-query result cache. Exits with status 1 if the router misroutes
+any question.
+
+Usage:
+    python benchmarks/bench_router.py [--corpus FILE] [--rounds N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.models.router import intent_router
+
+CORPUS_PATH = os.path.join(project_root, "benchmarks", "data", "routing_corpus.json")
+
+# Substring checks of the cascade the router replaced, in branch order
+LEGACY_INTENTS = [
+    ("percentage", ["percentage", "%"]),
+    ("count", ["count", "how many", "number"]),
+    ("average", ["average", "mean", "fare"]),
+    ("histogram", ["histogram", "distribution", "ages"]),
+]
+LEGACY_VALUES = [
+    (["male", "men"], ("Sex", "male")),
+    (["female", "women"], ("Sex", "female")),
+    (["survived"], ("Survived", 1)),
+    (["died", "perished"], ("Survived", 0)),
+    (["first class", "1st class"], ("Pclass", 1)),
+    (["second class", "2nd class"], ("Pclass", 2)),
+    (["third class", "3rd class"], ("Pclass", 3)),
+    (["southampton", "s port"], ("Embarked", "S")),
+    (["cherbourg", "c port"], ("Embarked", "C")),
+    (["queenstown", "q port"], ("Embarked", "Q")),
+]
+LEGACY_COLUMNS = [
+    ("sex", "Sex"), ("gender", "Sex"), ("class", "Pclass"), ("embarked", "Embarked"),
+    ("port", "Embarked"), ("survived", "Survived"), ("age", "Age"), ("fare", "Fare"),
+]
+
+
+def legacy_route(query):
+    """Route a query the way the substring cascade did."""
+    query_lower = query.lower()
+    intent = next(
+        (name for name, keys in LEGACY_INTENTS if any(key in query_lower for key in keys)),
+        "analysis"
+    )
+    if intent == "average":
+        column = "Age" if "age" in query_lower else "Fare"
+        return intent, column, None
+    for keys, (column, value) in LEGACY_VALUES:
+        if any(key in query_lower for key in keys):
+            return intent, column, value
+    column = next((name for key, name in LEGACY_COLUMNS if key in query_lower), None)
+    return intent, column, None
+
+
+def compiled_route(query):
+    route = intent_router.route(query)
+    return route.intent, route.column, route.value
+
+
+def accuracy(route, corpus):
+    """Return the list of (case, actual) pairs the route function got wrong."""
+    errors = []
+    for case in corpus:
+        actual = route(case["question"])
+        if actual != (case["intent"], case["column"], case["value"]):
+            errors.append((case, actual))
+    return errors
+
+
+def throughput(route, questions, rounds):
+    """Return routed questions per second."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            route(question)
+    return rounds * len(questions) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+    questions = [case["question"] for case in corpus]
+
+    failed = False
+    for name, route in (("legacy cascade", legacy_route), ("compiled router", compiled_route)):
+        errors = accuracy(route, corpus)
+        rate = throughput(route, questions, args.rounds)
+        correct = len(corpus) - len(errors)
+        print(f"{name:<16} accuracy {correct}/{len(corpus)} ({correct / len(corpus):.0%})"
+              f"  throughput {rate:,.0f} queries/s")
+        if route is compiled_route:
+            failed = bool(errors)
+            for case, actual in errors:
+                expected = (case["intent"], case["column"], case["value"])
+                print(f"  MISROUTED {case['question']!r}: {actual} != {expected}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup-time report: import cost of the app module and time until ready.
+
+Runs `python -X importtime -c "import backend.main"` in a fresh process and
+summarizes the slowest top-level packages, then measures how long a fresh
+process takes to import the app and finish its startup hook.
+
+Usage:
+    python benchmarks/bench_startup.py [--top N] [--output FILE]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READY_SCRIPT = """
+import asyncio, time
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(startup())
+print(f"{imported - start:.6f} {time.perf_counter() - start:.6f}")
+"""
+
+
+def import_times():
+    """Return {module: (self_us, cumulative_us)} for importing backend.main."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        cwd=project_root, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header line
+        times[fields[2].strip()] = (self_us, cumulative_us)
+    return times
+
+
+def time_to_ready():
+    """Return (seconds to import the app, seconds until startup completes)."""
+    env = dict(os.environ, PYTHONPATH=project_root)
+    result = subprocess.run(
+        [sys.executable, "-c", READY_SCRIPT],
+        cwd=project_root, env=env, capture_output=True, text=True, check=True
+    )
+    imported, ready = result.stdout.strip().splitlines()[-1].split()
+    return float(imported), float(ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    times = import_times()
+    packages = defaultdict(int)
+    for module, (self_us, _) in times.items():
+        packages[module.split(".")[0]] += self_us
+    total_us = times.get("backend.main", (0, sum(packages.values())))[1]
+
+    lines = [f"import backend.main: {total_us / 1000:.1f} ms ({len(times)} modules)", ""]
+    lines.append(f"{'package':<28} {'self ms':>10}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        lines.append(f"{package:<28} {self_us / 1000:>10.1f}")
+
+    imported, ready = time_to_ready()
+    lines += [
+        "",
+        f"fresh process: app imported after {imported * 1000:.1f} ms,"
+        f" startup hook done after {ready * 1000:.1f} ms",
+    ]
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark dataset load time for each storage backend.
+
+The bundled CSV is replicated into a larger temporary file so that parsing
+cost dominates, then loaded through every backend, with and without column
+projection.
+
+Usage:
+    python benchmarks/bench_storage.py [--rows N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import pandas as pd
+
+from backend.utils.storage import load_dataset
+
+CSV_PATH = os.path.join(project_root, "data", "titanic.csv")
+COLUMNS = ["Survived", "Pclass", "Sex", "Age", "Fare", "Embarked"]
+
+
+def time_load(path, storage, columns=None, repeat=3):
+    """Return the best load time in milliseconds and the storage used."""
+    best = float("inf")
+    used = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, _, used = load_dataset(path, storage, columns)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = pd.read_csv(CSV_PATH)
+        copies = max(1, args.rows // len(df))
+        path = os.path.join(tmp, "passengers.csv")
+        pd.concat([df] * copies, ignore_index=True).to_csv(path, index=False)
+        print(f"{len(df) * copies} rows, {os.path.getsize(path) / 1e6:.1f} MB CSV")
+
+        for storage in ("csv", "parquet", "arrow"):
+            # First load writes the columnar copy; time the cached loads
+            load_dataset(path, storage)
+            full, used = time_load(path, storage)
+            projected, _ = time_load(path, storage, COLUMNS)
+            print(f"  {storage:<8} (used {used:<7}) all columns: {full:8.1f} ms"
+                  f"  {len(COLUMNS)} columns: {projected:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
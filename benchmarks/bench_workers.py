@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory per worker and throughput scaling of multi-worker serving.
+
+For each worker count and dataset storage, starts `startup.py` with
+WEB_CONCURRENCY set, drives /api/v1/ask over HTTP with the weighted question
+mix from bench_load.py for a fixed duration, then reads each worker's
+memory from /proc/<pid>/smaps_rollup:
+
+    rss  resident memory, counting shared pages in full
+    pss  resident memory with shared pages divided among their users
+    uss  memory private to the worker (what adding a worker really costs)
+
+"shared" storage maps one copy of the dataset from shared memory in every
+worker; "arrow" gives each worker its own copy. The dataset is replicated
+to --rows rows so its size dominates the per-worker memory. Linux only.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1 2 4] [--storage shared arrow]
+                                       [--rows N] [--duration S] [--concurrency N]
+                                       [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the project root to the path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.bench_load import DEFAULT_MIX, load_mix
+from benchmarks.common import DEFAULT_TOLERANCE, compare_to_baseline, make_report, write_report
+
+CSV_PATH = os.path.join(project_root, "data", "titanic.csv")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(parent_pid):
+    """Return the uvicorn worker processes started by a supervisor."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if ppid == parent_pid and "resource_tracker" not in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+def memory_mb(pid):
+    """Return rss, pss and uss of a process in MiB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+async def drive(base_url, questions, weights, concurrency, duration, seed):
+    """Send questions for duration seconds and return (requests, errors)."""
+    import httpx
+
+    rng = random.Random(seed)
+    counts = {"requests": 0, "errors": 0}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                query = rng.choices(questions, weights)[0]
+                try:
+                    response = await client.post("/api/v1/ask", json={"query": query})
+                    if response.status_code != 200:
+                        counts["errors"] += 1
+                except httpx.HTTPError:
+                    counts["errors"] += 1
+                counts["requests"] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts["requests"], counts["errors"]
+
+
+def wait_until_ready(process, base_url, workers, timeout=120):
+    """Wait until the server answers and all its workers are running."""
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            ready = httpx.get(f"{base_url}/api/v1/health", timeout=1).status_code == 200
+        except httpx.HTTPError:
+            ready = False
+        if ready and (workers == 1 or len(worker_pids(process.pid)) >= workers):
+            return
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run_server(args, csv_path, storage, workers):
+    """Start a server, load it and return its measurements."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        DATA_PATH=csv_path,
+        DATA_STORAGE=storage,
+        PREWARM_CHARTS="false",
+        ANSWER_CACHE="off",
+        CHART_CACHE_SIZE="0",
+        METRICS_ENABLED="false",
+    )
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(project_root, "startup.py")],
+        env=env, cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(process, base_url, workers)
+        questions, weights = load_mix(args.mix)
+        # Warm every worker up so the measurement excludes lazy loading
+        asyncio.run(drive(base_url, questions, weights, args.concurrency, args.warmup, args.seed))
+        requests, errors = asyncio.run(
+            drive(base_url, questions, weights, args.concurrency, args.duration, args.seed)
+        )
+        pids = worker_pids(process.pid) if workers > 1 else [process.pid]
+        memory = [memory_mb(pid) for pid in pids]
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    result = {
+        "throughput_per_s": requests / args.duration,
+        "errors": errors,
+    }
+    for kind in ("rss", "pss", "uss"):
+        result[f"{kind}_mb_per_worker"] = sum(m[kind] for m in memory) / len(memory)
+    result["pss_mb_total"] = sum(m["pss"] for m in memory)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--storage", nargs="+", default=["shared", "arrow"], choices=["shared", "arrow", "csv"])
+    parser.add_argument("--rows", type=int, default=1_000_000,
+                        help="Replicate the dataset to about this many rows")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per configuration")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="JSON list of {query, weight}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    tmp = tempfile.mkdtemp()
+    try:
+        df = pd.read_csv(CSV_PATH)
+        csv_path = os.path.join(tmp, "titanic.csv")
+        pd.concat([df] * max(1, args.rows // len(df)), ignore_index=True).to_csv(csv_path, index=False)
+        print(f"{os.cpu_count()} CPUs, {max(1, args.rows // len(df)) * len(df)} rows, "
+              f"{args.duration:g} s per run at concurrency {args.concurrency}\n")
+        print(f"{'storage':<8} {'workers':>7} {'req/s':>8} {'scaling':>8} "
+              f"{'rss/worker':>11} {'pss/worker':>11} {'uss/worker':>11} {'pss total':>10}")
+
+        metrics = {}
+        for storage in args.storage:
+            single = None
+            for workers in args.workers:
+                result = run_server(args, csv_path, storage, workers)
+                if single is None:
+                    single = result["throughput_per_s"] / workers
+                scaling = result["throughput_per_s"] / single if single else 0
+                print(f"{storage:<8} {workers:>7} {result['throughput_per_s']:>8.1f} {scaling:>7.2f}x "
+                      f"{result['rss_mb_per_worker']:>9.1f}Mi {result['pss_mb_per_worker']:>9.1f}Mi "
+                      f"{result['uss_mb_per_worker']:>9.1f}Mi {result['pss_mb_total']:>8.1f}Mi"
+                      + (f"  ({result['errors']} errors)" if result["errors"] else ""))
+                for name, value in result.items():
+                    metrics[f"{storage}.workers_{workers}.{name}"] = value
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = make_report("workers", metrics, rows=args.rows, concurrency=args.concurrency)
+    if args.output:
+        write_report(report, args.output)
+    if args.baseline and compare_to_baseline(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
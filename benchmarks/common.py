@@ -0,0 +1,106 @@
+"""
+Helpers shared by the benchmark scripts: timing, percentiles, peak memory,
+and JSON reports that can be compared against a saved baseline.
+
+A report is a dictionary with a "benchmark" name, an "environment"
+description and a flat "metrics" mapping of name to number. Metric names
+ending in "_per_s" are better when higher; all others when lower.
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+# Default slowdown accepted by compare_to_baseline before a metric counts
+# as a regression, as a fraction of the baseline value
+DEFAULT_TOLERANCE = 0.15
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the pct-th percentile of samples (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def time_call(func: Callable[[], Any], min_time: float = 0.2, min_runs: int = 5,
+              setup: Callable[[], Any] = None) -> List[float]:
+    """
+    Call func repeatedly and return the duration of each call in seconds.
+
+    Args:
+        func: Callable to time
+        min_time: Keep calling until this many seconds have been measured
+        min_runs: Minimum number of calls
+        setup: Optional callable run, untimed, before each call
+    """
+    samples = []
+    while len(samples) < min_runs or sum(samples) < min_time:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and interpreter a report was produced on."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def make_report(benchmark: str, metrics: Dict[str, float], **extra) -> Dict[str, Any]:
+    """Build a report for write_report and compare_to_baseline."""
+    return dict(benchmark=benchmark, environment=environment(), metrics=metrics, **extra)
+
+
+def write_report(report: Dict[str, Any], path: str):
+    """Write a report as JSON, creating the parent directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline_path: str,
+                        tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compare a report's metrics with a baseline report and print the change
+    of each metric present in both.
+
+    Returns:
+        Names of the metrics that regressed by more than tolerance
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["metrics"]
+
+    regressions = []
+    print(f"\n{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in sorted(report["metrics"].items()):
+        if name not in baseline or not baseline[name]:
+            continue
+        change = (value - baseline[name]) / baseline[name]
+        # Express the change so that positive always means worse
+        worse = -change if name.endswith("_per_s") else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{name:<48} {baseline[name]:>12.4g} {value:>12.4g} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
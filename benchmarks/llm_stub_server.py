@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Stand-in OpenAI-compatible chat completions server for the LLM fallback.
+
+Answers every request with a canned completion after a fixed delay and
+reports token usage by counting words, so the fallback's timeouts,
+concurrency limit, token accounting and cache can be exercised without a
+real model. It records how many requests it served and the most it served
+at the same time.
+
+Usage:
+    python benchmarks/llm_stub_server.py [--port 8001] [--latency 0.5]
+
+    LLM_FALLBACK=true LLM_BASE_URL=http://localhost:8001/v1 python -m main
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+
+def create_app(latency: float = 0.5) -> FastAPI:
+    """
+    Build the stub server.
+
+    Args:
+        latency: Seconds each completion takes
+    """
+    app = FastAPI(title="LLM stub")
+    app.state.requests = 0
+    app.state.in_flight = 0
+    app.state.peak_in_flight = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        app.state.requests += 1
+        app.state.in_flight += 1
+        app.state.peak_in_flight = max(app.state.peak_in_flight, app.state.in_flight)
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            app.state.in_flight -= 1
+        question = body["messages"][-1]["content"]
+        text = f"Stub answer to: {question}"
+        prompt_tokens = sum(len(message["content"].split()) for message in body["messages"])
+        completion_tokens = len(text.split())
+        return {
+            "id": f"chatcmpl-stub-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests, "peak_in_flight": app.state.peak_in_flight}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
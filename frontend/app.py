@@ -1,9 +1,19 @@
 import streamlit as st
 import requests
-import json
-import os
 from typing import Dict, Any
 import streamlit.components.v1 as components
+import plotly.graph_objects as go
+
+from backend_client import BackendClient, CallTiming
+from message_store import Message, MessageStore
+
+# Number of backend calls listed in the debug expander
+DEBUG_CALL_HISTORY = 20
+
+# The newest messages are rendered in full on every rerun; older ones are
+# only rendered on request, one page at a time
+RECENT_MESSAGES = 6
+HISTORY_PAGE_SIZE = 10
 
 # Set up the Streamlit page
 st.set_page_config(
@@ -19,9 +29,30 @@ Welcome to the Titanic Dataset Explorer! Ask questions about the Titanic passeng
 and get both text answers and visual insights.
 """)
 
+@st.cache_resource
+def get_backend_client() -> BackendClient:
+    """Return the backend client shared by every session and rerun."""
+    return BackendClient()
+
+backend = get_backend_client()
+
+def render_message(message: Message):
+    """Render a stored chat message with its chart, if any."""
+    with st.chat_message(message.role):
+        if message.error:
+            st.error(message.content)
+        else:
+            st.write(message.content)
+        figure_spec = message.figure_spec
+        if figure_spec is not None:
+            st.plotly_chart(go.Figure(figure_spec), use_container_width=True)
+
 # Initialize session state for chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "message_store" not in st.session_state:
+    st.session_state.message_store = MessageStore()
+messages = st.session_state.message_store
+if "call_timings" not in st.session_state:
+    st.session_state.call_timings = []
 
 # Sidebar with example questions
 with st.sidebar:
@@ -50,9 +81,19 @@ chat_container = st.container()
 
 # Display chat history
 with chat_container:
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
+    if messages.dropped:
+        st.caption(f"{messages.dropped} older messages were removed to keep the history small.")
+    pages = messages.page_count(RECENT_MESSAGES, HISTORY_PAGE_SIZE)
+    if pages and st.toggle(f"Show {len(messages) - RECENT_MESSAGES} earlier messages", key="show_history"):
+        page = 0
+        if pages > 1:
+            page = st.number_input("Page (1 = most recent)", min_value=1, max_value=pages, value=1,
+                                   key="history_page") - 1
+        for message in messages.page(page, RECENT_MESSAGES, HISTORY_PAGE_SIZE):
+            render_message(message)
+        st.divider()
+    for message in messages.recent(RECENT_MESSAGES):
+        render_message(message)
 
 # User input form
 with st.form(key="chat_form", clear_on_submit=True):
@@ -68,7 +109,7 @@ with st.form(key="chat_form", clear_on_submit=True):
 # Process user input
 if submit_button and user_input.strip():
     # Add user message to history
-    st.session_state.messages.append({"role": "user", "content": user_input})
+    messages.add("user", user_input)
     
     # Show user message immediately
     with chat_container:
@@ -76,63 +117,72 @@ if submit_button and user_input.strip():
             st.write(user_input)
     
     # Show a spinner while processing
+    timing = CallTiming("/ask/stream")
     with st.spinner("Analyzing your question..."):
         try:
-            # Send request to the backend API
-            # Use your Render backend URL
-            # Update this with your actual Render backend URL
-            api_url = os.getenv("BACKEND_URL", "https://chat-bot-5pr0.onrender.com/") + "/api/v1/ask"
-            payload = {"query": user_input}
-            
-            response = requests.post(api_url, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                if result["success"]:
-                    # Add bot response to history
-                    response_text = result["text_response"]
-                    visualization_html = result["visualization"]
-                    
-                    st.session_state.messages.append({"role": "assistant", "content": response_text})
-                    
-                    # Display bot response
-                    with chat_container:
-                        with st.chat_message("assistant"):
+            # Ask for compact figure specs and draw them with st.plotly_chart.
+            # Render each chunk of the answer as soon as it arrives.
+            response_text = ""
+            figure_spec = None
+            failed = False
+            with chat_container:
+                with st.chat_message("assistant"):
+                    for event in backend.stream_ask(user_input, "json", timing):
+                        if event["type"] == "text":
+                            response_text = event["text_response"]
                             st.write(response_text)
-                            
+                        elif event["type"] == "visualization":
                             # Display visualization if available
-                            if visualization_html:
-                                components.html(visualization_html, height=600)
-                else:
-                    error_msg = f"Error: {result['text_response']}"
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    
-                    with chat_container:
-                        with st.chat_message("assistant"):
-                            st.error(error_msg)
-            else:
-                error_msg = f"Error connecting to the backend API: {response.status_code}"
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                
-                with chat_container:
-                    with st.chat_message("assistant"):
-                        st.error(error_msg)
-                        
+                            if event.get("visualization_format") == "json":
+                                figure_spec = event["visualization"]
+                                st.plotly_chart(go.Figure(figure_spec), use_container_width=True)
+                            else:
+                                components.html(event["visualization"], height=600)
+                        elif event["type"] == "error":
+                            response_text = f"Error: {event['text_response']}"
+                            failed = True
+                            st.error(response_text)
+            
+            messages.add("assistant", response_text, figure_spec, error=failed)
+        
+        except requests.exceptions.HTTPError as e:
+            error_msg = f"Error connecting to the backend API: {e.response.status_code}"
+            messages.add("assistant", error_msg, error=True)
+            
+            with chat_container:
+                with st.chat_message("assistant"):
+                    st.error(error_msg)
         except requests.exceptions.ConnectionError:
-            error_msg = "Could not connect to the backend API. Please make sure the FastAPI server is running on http://localhost:8000"
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            error_msg = f"Could not connect to the backend API. Please make sure the FastAPI server is running at {backend.base_url}"
+            messages.add("assistant", error_msg, error=True)
+            
+            with chat_container:
+                with st.chat_message("assistant"):
+                    st.error(error_msg)
+        except requests.exceptions.Timeout:
+            error_msg = "The backend API took too long to answer. Please try again."
+            messages.add("assistant", error_msg, error=True)
             
             with chat_container:
                 with st.chat_message("assistant"):
                     st.error(error_msg)
         except Exception as e:
             error_msg = f"An unexpected error occurred: {str(e)}"
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            messages.add("assistant", error_msg, error=True)
             
             with chat_container:
                 with st.chat_message("assistant"):
                     st.error(error_msg)
+        finally:
+            st.session_state.call_timings.append(timing.to_dict())
+            del st.session_state.call_timings[:-DEBUG_CALL_HISTORY]
+
+# Latency of this session's recent backend calls
+with st.expander("🔧 Debug: backend calls"):
+    if st.session_state.call_timings:
+        st.dataframe(list(reversed(st.session_state.call_timings)), use_container_width=True)
+    else:
+        st.caption("No backend calls yet.")
 
 # Add some space at the bottom
 st.markdown("---")
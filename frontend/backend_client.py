@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+# Backend base URL. Update this with your actual Render backend URL.
+BACKEND_URL = os.getenv("BACKEND_URL", "https://chat-bot-5pr0.onrender.com/").rstrip("/")
+
+# Seconds to wait for a connection, and between bytes of the response
+BACKEND_CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", 5))
+BACKEND_READ_TIMEOUT = float(os.getenv("BACKEND_READ_TIMEOUT", 60))
+
+# Retries on connection errors and 502/503/504 responses, waiting
+# BACKEND_RETRY_BACKOFF * 2 ** (attempt - 1) seconds between attempts
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", 3))
+BACKEND_RETRY_BACKOFF = float(os.getenv("BACKEND_RETRY_BACKOFF", 0.5))
+
+# Keep-alive connections kept open to the backend
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", 10))
+
+# Ask for compressed responses. Brotli is accepted when the brotli package
+# is installed, gzip always.
+BACKEND_COMPRESSION = os.getenv("BACKEND_COMPRESSION", "true").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class CallTiming:
+    """
+    Timing of one backend call.
+
+    Attributes:
+        endpoint: Path that was called
+        status: HTTP status code, or None if no response arrived
+        headers_ms: Time until the response headers arrived
+        total_ms: Time until the response body was read
+        body_bytes: Response body size after decompression
+        encoding: Content-Encoding the body was sent with
+        retries: Number of retried attempts
+        error: Exception message if the call failed
+    """
+    endpoint: str
+    status: Optional[int] = None
+    headers_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    body_bytes: Optional[int] = None
+    encoding: Optional[str] = None
+    retries: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class BackendClient:
+    """
+    Client for the chatbot API sharing one pooled keep-alive session.
+
+    Requests use connect/read timeouts and are retried with exponential
+    backoff on connection errors and gateway errors, which covers a backend
+    that is still waking up. The API's endpoints only read data, so POSTs
+    are safe to retry.
+    """
+
+    def __init__(self, base_url: str = BACKEND_URL,
+                 connect_timeout: float = BACKEND_CONNECT_TIMEOUT,
+                 read_timeout: float = BACKEND_READ_TIMEOUT,
+                 retries: int = BACKEND_RETRIES, backoff: float = BACKEND_RETRY_BACKOFF,
+                 pool_size: int = BACKEND_POOL_SIZE, compression: bool = BACKEND_COMPRESSION):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Backend base URL, without the /api/v1 prefix
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of the response
+            retries: Maximum number of retries per request
+            backoff: Backoff factor in seconds between retries
+            pool_size: Keep-alive connections kept per host
+            compression: Ask for gzip (and brotli, if available) responses
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # urllib3 only lists the encodings it can decode
+        self.session.headers["Accept-Encoding"] = (
+            make_headers(accept_encoding=True)["accept-encoding"] if compression else "identity"
+        )
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/api/v1{path}"
+
+    def _send(self, method: str, path: str, timing: CallTiming, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            timing.total_ms = (time.perf_counter() - start) * 1000
+            timing.error = str(e)
+            raise
+        timing.headers_ms = (time.perf_counter() - start) * 1000
+        timing.status = response.status_code
+        timing.encoding = response.headers.get("Content-Encoding", "identity")
+        retries = getattr(response.raw, "retries", None)
+        timing.retries = len(retries.history) if retries is not None else 0
+        return response
+
+    def _finish(self, timing: CallTiming, start: float, body_bytes: int):
+        timing.total_ms = (time.perf_counter() - start) * 1000
+        timing.body_bytes = body_bytes
+
+    def get(self, path: str, timing: CallTiming = None) -> Dict[str, Any]:
+        """
+        GET an endpoint and return its JSON body.
+
+        Raises:
+            requests.HTTPError: If the response status is an error
+        """
+        timing = timing if timing is not None else CallTiming(path)
+        start = time.perf_counter()
+        response = self._send("GET", path, timing)
+        content = response.content
+        self._finish(timing, start, len(content))
+        response.raise_for_status()
+        return response.json()
+
+    def stream_ask(self, query: str, visualization_format: str = "json",
+                   timing: CallTiming = None) -> Iterator[Dict[str, Any]]:
+        """
+        Ask a question through /ask/stream and yield its events as they
+        arrive. The connection returns to the pool once the answer is read.
+
+        Args:
+            query: The question
+            visualization_format: "json" for figure specs or "html"
+            timing: Filled in with the call's timing as the answer is read
+
+        Raises:
+            requests.HTTPError: If the response status is an error
+        """
+        timing = timing if timing is not None else CallTiming("/ask/stream")
+        start = time.perf_counter()
+        payload = {"query": query, "visualization_format": visualization_format}
+        with self._send("POST", "/ask/stream", timing, json=payload, stream=True) as response:
+            response.raise_for_status()
+            body_bytes = 0
+            try:
+                for line in response.iter_lines():
+                    body_bytes += len(line) + 1
+                    if line:
+                        yield json.loads(line)
+            except requests.RequestException as e:
+                timing.error = str(e)
+                raise
+            finally:
+                self._finish(timing, start, body_bytes)
@@ -0,0 +1,97 @@
+import json
+import os
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Upper bounds on a session's chat history. Charts are stored compressed,
+# so a long session stays small; the oldest messages are dropped first.
+MESSAGE_STORE_MAX_BYTES = int(os.getenv("MESSAGE_STORE_MAX_BYTES", 2 * 1024 * 1024))
+MESSAGE_STORE_MAX_MESSAGES = int(os.getenv("MESSAGE_STORE_MAX_MESSAGES", 200))
+
+
+@dataclass
+class Message:
+    """
+    One chat message.
+
+    Attributes:
+        role: "user" or "assistant"
+        content: Text of the message
+        chart: zlib-compressed JSON plotly figure spec, if any
+        error: Whether the message reports an error
+    """
+    role: str
+    content: str
+    chart: Optional[bytes] = None
+    error: bool = False
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = len(self.content.encode()) + len(self.chart or b"")
+
+    @property
+    def figure_spec(self) -> Optional[Dict[str, Any]]:
+        """The chart's figure spec, decompressed."""
+        if self.chart is None:
+            return None
+        return json.loads(zlib.decompress(self.chart))
+
+
+class MessageStore:
+    """
+    Chat history bounded by total size and message count.
+
+    Messages are kept in order; when a bound is exceeded the oldest ones
+    are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, max_bytes: int = MESSAGE_STORE_MAX_BYTES,
+                 max_messages: int = MESSAGE_STORE_MAX_MESSAGES):
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.bytes = 0
+        self.dropped = 0
+        self._messages = deque()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, role: str, content: str, figure_spec: Dict[str, Any] = None,
+            error: bool = False) -> Message:
+        """
+        Append a message, compressing its figure spec, and drop the oldest
+        messages over the bounds.
+        """
+        chart = None
+        if figure_spec is not None:
+            chart = zlib.compress(json.dumps(figure_spec, separators=(",", ":")).encode(), 6)
+        message = Message(role, content, chart, error)
+        self._messages.append(message)
+        self.bytes += message.size
+        while len(self._messages) > 1 and (
+            self.bytes > self.max_bytes or len(self._messages) > self.max_messages
+        ):
+            self.bytes -= self._messages.popleft().size
+            self.dropped += 1
+        return message
+
+    def recent(self, count: int) -> List[Message]:
+        """Return the last count messages, oldest first."""
+        start = max(0, len(self._messages) - count)
+        return [self._messages[i] for i in range(start, len(self._messages))]
+
+    def page_count(self, skip_recent: int, page_size: int) -> int:
+        """Number of pages of older messages, excluding the skip_recent newest."""
+        older = max(0, len(self._messages) - skip_recent)
+        return -(-older // page_size)
+
+    def page(self, number: int, skip_recent: int, page_size: int) -> List[Message]:
+        """
+        Return one page of the older messages, oldest first. Page 0 holds
+        the messages just before the skip_recent newest ones.
+        """
+        end = max(0, len(self._messages) - skip_recent - number * page_size)
+        start = max(0, end - page_size)
+        return [self._messages[i] for i in range(start, end)]
@@ -12,6 +12,18 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+# Number of worker processes. With more than one, the dataset is loaded once
+# into shared memory and every worker maps the same copy.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+if WEB_CONCURRENCY > 1:
+    # Storage settings are read at import time, so choose before importing
+    os.environ.setdefault("DATA_STORAGE", "shared")
+    # A reload, e.g. through /admin/reload, only happens in the worker that
+    # handles it; the others pick up a changed file by watching it, so the
+    # watcher is always on with several workers
+    if float(os.environ.get("DATASET_WATCH_INTERVAL", 0)) <= 0:
+        os.environ["DATASET_WATCH_INTERVAL"] = "5"
+
 # Import app with proper error handling
 try:
     from backend.main import app
@@ -23,10 +35,21 @@ except ImportError as e:
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    print(f"Starting server on port {port}")
-    uvicorn.run(
-        "backend.main:app", 
-        host="0.0.0.0", 
-        port=port,
-        reload=False  # Disable reload in production
-    )
\ No newline at end of file
+    print(f"Starting server on port {port} with {WEB_CONCURRENCY} worker(s)")
+    shared_loader = None
+    if os.environ.get("DATA_STORAGE") == "shared":
+        from backend.utils.data_loader import TitanicDataLoader
+        from backend.utils.shared_dataset import remove_shared_datasets
+        # Publish the shared copy before the workers start so they only map it
+        shared_loader = TitanicDataLoader(storage="shared")
+    try:
+        uvicorn.run(
+            "backend.main:app", 
+            host="0.0.0.0", 
+            port=port,
+            workers=WEB_CONCURRENCY,
+            reload=False  # Disable reload in production
+        )
+    finally:
+        if shared_loader is not None:
+            remove_shared_datasets(shared_loader.data_path)